@@ -0,0 +1,10 @@
+import sys
+from .text_compressor import comprimir_flujo, descomprimir_flujo
+
+# Comprimir / descomprimir desde la consola con el modo adaptativo:
+#   python -m compresion < entrada > salida.bin
+#   python -m compresion -d < salida.bin > entrada
+if sys.argv[1:] == ["-d"]:
+    descomprimir_flujo(sys.stdin.buffer, sys.stdout.buffer)
+else:
+    comprimir_flujo(sys.stdin.buffer, sys.stdout.buffer)
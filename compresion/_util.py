@@ -0,0 +1,98 @@
+# Funciones auxiliares compartidas por los compresores de texto,
+# imagen y audio
+import os, mmap
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# -------------------------------------------------------------
+# Funciones auxiliares: enteros de longitud variable (LEB128)
+# -------------------------------------------------------------
+def _varint(n):
+    out = bytearray()
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _leer_varint(buf, pos):
+    n = 0
+    shift = 0
+    while True:
+        if pos >= len(buf):
+            raise ValueError("Datos truncados: varint incompleto")
+        byte = buf[pos]
+        pos += 1
+        n |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return n, pos
+        shift += 7
+
+
+# Varints de un arreglo entero, sin recorrerlo en Python
+def _varints(valores):
+    valores = np.asarray(valores, dtype=np.uint64)
+    if not len(valores):
+        return b""
+    # Cantidad de bytes de cada valor (7 bits por byte)
+    largos = np.ones(len(valores), dtype=np.int64)
+    resto = valores >> np.uint64(7)
+    while resto.any():
+        largos += resto > 0
+        resto >>= np.uint64(7)
+    k = np.arange(largos.max(), dtype=np.uint64)
+    salida = ((valores[:, None] >> (np.uint64(7) * k)) & np.uint64(0x7F)).astype(np.uint8)
+    # Bit de continuacion en todos los bytes menos el ultimo de cada valor
+    salida[k[None, :] < (largos - 1)[:, None]] |= 0x80
+    return salida[k[None, :] < largos[:, None]].tobytes()
+
+
+def _leer_varints(datos):
+    datos = np.frombuffer(datos, dtype=np.uint8)
+    if not len(datos):
+        return np.zeros(0, dtype=np.uint64)
+    if datos[-1] >= 0x80:
+        raise ValueError("Datos truncados: varint incompleto")
+    # Cada valor termina en un byte sin bit de continuacion
+    ultimos = np.flatnonzero(datos < 0x80)
+    inicios = np.concatenate(([0], ultimos[:-1] + 1))
+    posicion = np.arange(len(datos)) - np.repeat(inicios, ultimos - inicios + 1)
+    partes = (datos & 0x7F).astype(np.uint64) << (np.uint64(7) * posicion.astype(np.uint64))
+    return np.add.reduceat(partes, inicios)
+
+
+# -------------------------------------------------------------
+# Abrir un archivo con mmap: se lee como un buffer, sin copiarlo
+# -------------------------------------------------------------
+def _mapear(path):
+    with open(path, 'rb') as f:
+        # mmap no admite archivos vacios
+        if not os.fstat(f.fileno()).st_size:
+            raise ValueError("Archivo vacio")
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+# -------------------------------------------------------------
+# Ejecutar "funcion" sobre cada tarea usando varios procesos.
+# Los resultados salen en el mismo orden de las tareas (la salida no
+# depende de la cantidad de procesos) y como maximo hay 2 tareas por
+# proceso en memoria a la vez
+# -------------------------------------------------------------
+def _mapa_ordenado(funcion, tareas, procesos=1):
+    if procesos is None:
+        procesos = os.cpu_count() or 1
+    if procesos <= 1:
+        for tarea in tareas:
+            yield funcion(*tarea)
+        return
+
+    with ProcessPoolExecutor(procesos) as pool:
+        pendientes = deque()
+        for tarea in tareas:
+            pendientes.append(pool.submit(funcion, *tarea))
+            if len(pendientes) >= 2 * procesos:
+                yield pendientes.popleft().result()
+        while pendientes:
+            yield pendientes.popleft().result()
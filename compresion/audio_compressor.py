@@ -1,56 +1,665 @@
-import os, pickle, wave, struct
+import os, pickle, struct, wave
+from collections import namedtuple
+from operator import mul
+import numpy as np
+from ._util import _varint, _leer_varint, _varints, _leer_varints, _mapa_ordenado, _mapear
 
-# Funcion para leer un archivo WAV y obtener sus muestras
+# Muestras PCM segun los bytes por muestra del WAV: 8 bits sin signo
+# y 16 o 32 bits con signo, little-endian. Las de 24 bits se arman a
+# mano (no hay un tipo de NumPy de 3 bytes)
+TIPOS_MUESTRA = {1: np.dtype('u1'), 2: np.dtype('<i2'), 4: np.dtype('<i4')}
+ANCHOS_PCM = (1, 2, 3, 4)
+MUESTRA = TIPOS_MUESTRA[2]   # Formatos antiguos: siempre 16 bits
+
+# Frames que se leen por bloque al comprimir, y muestras que se
+# escriben por bloque al descomprimir (limitan la memoria usada)
+TAM_BLOQUE = 1 << 16
+
+# Funcion para pasar frames PCM a muestras enteras con signo (las de
+# 8 bits se centran en 0). Las de 16 y 32 bits son un arreglo sobre
+# el buffer de frames, sin copiarlo
+def muestras_pcm(frames, ancho):
+    if ancho not in ANCHOS_PCM:
+        raise ValueError(f"WAV de {ancho * 8} bits no soportado")
+    if ancho == 1:
+        return np.frombuffer(frames, dtype=np.uint8).astype(np.int16) - 128
+    if ancho == 3:
+        bytes_muestra = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        ampliadas = np.zeros((len(bytes_muestra), 4), dtype=np.uint8)
+        ampliadas[:, 1:] = bytes_muestra
+        # El byte alto queda arriba: el corrimiento conserva el signo
+        return ampliadas.view('<i4')[:, 0] >> 8
+    return np.frombuffer(frames, dtype=TIPOS_MUESTRA[ancho])
+
+# Funcion inversa: muestras enteras a frames PCM
+def frames_pcm(samples, ancho):
+    samples = np.asarray(samples)
+    if ancho == 1:
+        return (samples + 128).astype(np.uint8).tobytes()
+    if ancho == 3:
+        return samples.astype('<i4').view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    return samples.astype(TIPOS_MUESTRA[ancho]).tobytes()
+
+# Menor y mayor muestra posibles con "ancho" bytes
+def rango_pcm(ancho):
+    bits = 8 * ancho
+    return -(1 << (bits - 1)), (1 << (bits - 1)) - 1
+
+# Funcion para leer un archivo WAV y obtener sus muestras (intercaladas
+# por canal, como en el archivo)
 def leer_wav_sample(path):
     with wave.open(path, 'rb') as wf:
         params = wf.getparams()
-        n = wf.getnframes()
-        frames = wf.readframes(n)
-        fmt = '<' + 'h' * (n * params.nchannels)
-        samples = list(struct.unpack(fmt, frames))
+        frames = wf.readframes(wf.getnframes())
+    samples = muestras_pcm(frames, params.sampwidth)
     return params, samples
 
-# Funcion para escribir un archivo WAV a partir de una lista de muestras
+# Funcion para escribir un archivo WAV a partir de las muestras
+# (arreglo o lista de enteros)
 def escribir_wav_samples(path, params, samples):
     with wave.open(path, 'wb') as wf:
         wf.setparams(params)
-        frames = struct.pack('<' + 'h' * len(samples), *samples)
-        wf.writeframes(frames)
-
-# Funcion para comprimir un archivo WAV usando cuantizacion y RLE
-def comprimir_wav(wav_entrada, out_dir, quant=500):
-    params, samples = leer_wav_sample(wav_entrada)
-    q = [int(s / quant) * quant for s in samples]
-    comprimido = []
-    prev = q[0]
-    count = 1
-    for s in q[1:]:
-        if s == prev:
-            count += 1
-        else:
-            comprimido.append((prev, count))
-            prev = s
-            count = 1
-    comprimido.append((prev, count))
+        wf.writeframes(frames_pcm(samples, params.sampwidth))
+
+# Funcion para calcular las corridas (valor, repeticiones) de un arreglo
+def calcular_corridas(valores):
+    inicios = np.flatnonzero(np.concatenate(([True], valores[1:] != valores[:-1])))
+    cuentas = np.diff(np.append(inicios, len(valores)))
+    return valores[inicios], cuentas
+
+# Mid/side (como en FLAC): mid = (L + R) >> 1 y side = L - R. El bit
+# que se pierde en mid es el mismo que el bit bajo de side
+def a_mid_side(x):
+    izq, der = x[:, 0], x[:, 1]
+    return np.stack(((izq + der) >> 1, izq - der), axis=1)
+
+def desde_mid_side(x):
+    side = x[:, 1]
+    mid = (x[:, 0] << 1) | (side & 1)
+    return np.stack(((mid + side) >> 1, (mid - side) >> 1), axis=1)
+
+# -------------------------------------------------------------
+# Formato binario del .arle:
+#   MAGIC "ARLE", version (1 byte), modo (1 byte)
+#   canales (2 bytes), bytes por muestra (2), frecuencia (4), frames (4)
+#   opciones (1 byte, bit 0 = canales en mid/side)
+#   datos propios del modo (RLE: paso de cuantizacion en varint y
+#   bytes por indice)
+#   bloques hasta el final del archivo: largo en bytes (varint) + bloque
+# En modo RLE cada bloque guarda la cantidad de frames (varint) y, para
+# cada canal por separado, la cantidad de corridas * 2 + continua y el
+# largo de las repeticiones (varints), los valores de las corridas
+# divididos por el paso (enteros con signo de 1, 2, 4 u 8 bytes) y las
+# repeticiones en varint. Una corrida abierta al final de un bloque
+# sigue en el siguiente: si el canal empieza con el mismo valor,
+# continua = 1 y la primera corrida guarda solo sus repeticiones (el
+# valor es el ultimo del bloque anterior).
+# La version 2 (sin continua: las corridas se cierran en cada bloque),
+# la version 1 (solo 16 bits, sin opciones, corridas sobre las muestras
+# intercaladas) y los .arle antiguos en pickle (una tupla (params,
+# corridas), o los params seguidos de una lista de corridas por bloque)
+# se siguen pudiendo leer
+# -------------------------------------------------------------
+MAGIC = b"ARLE"
+VERSION = 3
+MODO_RLE = 0
+MODO_SIN_PERDIDA = 1
+CABECERA = struct.Struct('<HHII')
+OPCION_MID_SIDE = 1
+# Mismos campos que los parametros de wave (getparams / setparams)
+ParametrosWav = namedtuple('ParametrosWav', 'nchannels sampwidth framerate nframes comptype compname')
+TIPOS_ENTERO = {1: np.dtype('i1'), 2: np.dtype('<i2'), 4: np.dtype('<i4'), 8: np.dtype('<i8')}
+
+def _escribir_cabecera(f, modo, params, mid_side):
+    f.write(MAGIC + bytes((VERSION, modo)))
+    f.write(CABECERA.pack(params.nchannels, params.sampwidth, params.framerate, params.nframes))
+    f.write(bytes((OPCION_MID_SIDE if mid_side else 0,)))
+
+def _validar_params(params, mid_side):
+    if not params.nframes:
+        raise ValueError("Audio vacio")
+    if params.sampwidth not in ANCHOS_PCM:
+        raise ValueError(f"WAV de {params.sampwidth * 8} bits no soportado")
+    if mid_side and params.nchannels != 2:
+        raise ValueError("mid/side solo se puede usar con audio estereo")
+
+# Entero con signo mas chico (bytes, tipo) que guarda de minimo a maximo
+def _tipo_entero(minimo, maximo):
+    for ancho, tipo in TIPOS_ENTERO.items():
+        rango = np.iinfo(tipo)
+        if rango.min <= minimo and maximo <= rango.max:
+            return ancho, tipo
+
+# quant esta en la escala de las muestras de 16 bits: para otros anchos
+# el paso de cuantizacion se escala para que suene igual
+def _paso(quant, ancho):
+    return max(1, round(quant * 2.0 ** (8 * (ancho - 2))))
+
+# Funcion para elegir el tipo de los indices (muestra / paso); el canal
+# side de mid/side necesita un bit mas que las muestras
+def _tipo_indice(paso, ancho, mid_side):
+    minimo, maximo = rango_pcm(ancho)
+    if mid_side:
+        minimo, maximo = minimo - maximo, maximo - minimo
+    return _tipo_entero(-(-minimo // paso), maximo // paso)
+
+# Funcion para comprimir un archivo WAV usando cuantizacion y RLE.
+# Se lee por bloques de tam_bloque frames y cada bloque se escribe
+# apenas se calcula. Los canales se separan (opcionalmente en mid/side)
+# y cada uno tiene sus propias corridas, que siguen de un bloque al
+# siguiente (solo se guarda el ultimo valor de cada canal)
+def comprimir_wav(wav_entrada, out_dir, quant=500, tam_bloque=TAM_BLOQUE, mid_side=False):
     basename = os.path.splitext(os.path.basename(wav_entrada))[0]
     out_path = os.path.join(out_dir, basename + ".arle")
-    with open(out_path, 'wb') as f:
-        pickle.dump((params, comprimido), f)
+    if quant < 1:
+        raise ValueError("quant debe ser al menos 1")
+    n_samples = 0
+    n_runs = 0
+    with wave.open(wav_entrada, 'rb') as wf:
+        params = wf.getparams()
+        _validar_params(params, mid_side)
+        canales, ancho = params.nchannels, params.sampwidth
+        paso = _paso(quant, ancho)
+        ancho_indice, tipo = _tipo_indice(paso, ancho, mid_side)
+        with open(out_path, 'wb') as f:
+            _escribir_cabecera(f, MODO_RLE, params, mid_side)
+            f.write(_varint(paso) + bytes((ancho_indice,)))
+            ultimos = [None] * canales
+            while True:
+                frames = wf.readframes(tam_bloque)
+                if not frames:
+                    break
+                x = muestras_pcm(frames, ancho).astype(np.int64).reshape(-1, canales)
+                if mid_side:
+                    x = a_mid_side(x)
+                n_samples += x.size
+                partes = [_varint(len(x))]
+                for c in range(canales):
+                    # Cuantizar truncando hacia cero, igual que int(s / paso) * paso
+                    indices, cuentas = calcular_corridas(np.trunc(x[:, c] / paso).astype(np.int64))
+                    # La corrida abierta del bloque anterior sigue
+                    continua = int(indices[0] == ultimos[c])
+                    ultimos[c] = indices[-1]
+                    cuentas = _varints(cuentas)
+                    partes += [_varint(len(indices) << 1 | continua), _varint(len(cuentas)),
+                               indices[continua:].astype(tipo).tobytes(), cuentas]
+                    n_runs += len(indices) - continua
+                bloque = b"".join(partes)
+                f.write(_varint(len(bloque)))
+                f.write(bloque)
     stats = {
-        "samples": len(samples),
-        "runs": len(comprimido),
-        "quant": quant
+        "samples": n_samples,
+        "runs": n_runs,
+        "quant": quant,
+        "canales": params.nchannels,
+        "bits": params.sampwidth * 8,
+        "frecuencia": params.framerate
     }
     return out_path, stats
 
-# Funcion para descomprimir un archivo .arle y reconstruir el WAV
-def descomprimir_wav(arle_path, out_dir):
-    with open(arle_path, 'rb') as f:
-        params, comprimido = pickle.load(f)
-    samples = []
-    for val, count in comprimido:
-        samples.extend([val] * count)
+# Bloque RLE: devuelve las muestras (frames, canales) ya multiplicadas
+# por el paso. ultimos (version 3) tiene el ultimo valor de cada canal
+# en el bloque anterior y se actualiza con los de este bloque
+def _descomprimir_bloque_rle(bloque, tipo, paso, canales, ultimos=None):
+    n, pos = _leer_varint(bloque, 0)
+    x = np.empty((n, canales), dtype=np.int64)
+    for c in range(canales):
+        n_corridas, pos = _leer_varint(bloque, pos)
+        continua = 0
+        if ultimos is not None:
+            n_corridas, continua = n_corridas >> 1, n_corridas & 1
+            if continua and (ultimos[c] is None or not n_corridas):
+                raise ValueError("Archivo .arle corrupto: corrida sin bloque anterior")
+        largo, pos = _leer_varint(bloque, pos)
+        fin = pos + (n_corridas - continua) * tipo.itemsize
+        if fin + largo > len(bloque):
+            raise ValueError("Archivo .arle truncado")
+        indices = np.frombuffer(bloque, dtype=tipo, count=n_corridas - continua, offset=pos).astype(np.int64)
+        if continua:
+            indices = np.concatenate(([ultimos[c]], indices))
+        if ultimos is not None and n_corridas:
+            ultimos[c] = indices[-1]
+        cuentas = _leer_varints(bloque[fin:fin + largo]).astype(np.int64)
+        if len(cuentas) != n_corridas or cuentas.sum() != n:
+            raise ValueError("Archivo .arle corrupto: las corridas no coinciden con los frames")
+        x[:, c] = np.repeat(indices * paso, cuentas)
+        pos = fin + largo
+    return x
+
+# Bloque RLE de la version 1: corridas (valores, repeticiones) sobre
+# las muestras intercaladas
+def _corridas_v1(bloque, tipo, quant):
+    n, pos = _leer_varint(bloque, 0)
+    fin = pos + n * tipo.itemsize
+    if fin > len(bloque):
+        raise ValueError("Archivo .arle truncado")
+    indices = np.frombuffer(bloque, dtype=tipo, count=n, offset=pos).astype(np.int64)
+    cuentas = _leer_varints(bloque[fin:]).astype(np.int64)
+    if len(cuentas) != n:
+        raise ValueError("Archivo .arle truncado")
+    return indices * quant, cuentas
+
+# Funcion para expandir corridas en arreglos de a lo sumo 2 * maximo
+# muestras (las corridas mas largas que maximo se parten)
+def expandir_corridas(valores, cuentas, maximo=TAM_BLOQUE):
+    partes = -(-cuentas // maximo)
+    valores = np.repeat(valores, partes)
+    largas = cuentas
+    cuentas = np.full(len(valores), maximo, dtype=np.int64)
+    cuentas[np.cumsum(partes) - 1] = largas - maximo * (partes - 1)
+    # Grupos de corridas que terminan dentro de la misma ventana de "maximo" muestras
+    grupo = (np.cumsum(cuentas) - 1) // maximo
+    cortes = np.flatnonzero(np.diff(grupo)) + 1
+    for v, c in zip(np.split(valores, cortes), np.split(cuentas, cortes)):
+        yield np.repeat(v, c)
+
+# -------------------------------------------------------------
+# Modo sin perdida (estilo FLAC). Cada bloque es independiente:
+# cantidad de frames (varint) y un subbloque por canal (constante,
+# prediccion fija de orden 0 a 4, LPC o literal). Los residuos de la
+# prediccion se guardan con codigos de Rice, con un parametro k por
+# particion del bloque. El subbloque literal guarda los bytes por
+# muestra que usa (en la version 1 siempre eran 2)
+# -------------------------------------------------------------
+TAM_BLOQUE_LPC = 4096        # Frames por bloque en modo sin perdida
+SUB_CONSTANTE, SUB_FIJO, SUB_LPC, SUB_LITERAL = range(4)
+ORDEN_MAX_FIJO = 4
+ORDEN_MAX_LPC = 8
+PRECISION_LPC = 14           # Bits de los coeficientes cuantizados
+MAX_SHIFT_LPC = 15
+ORDEN_MAX_PARTICION = 6      # Hasta 2**6 particiones de Rice por subbloque
+MIN_PARTICION = 64           # Residuos minimos por particion
+MAX_RICE = 31
+
+# Zigzag: enteros con signo a sin signo (0, -1, 1, -2... -> 0, 1, 2, 3...)
+def _zigzag(x):
+    return ((x << 1) ^ (x >> 63)).astype(np.uint64)
+
+def _deszigzag(u):
+    return (u >> np.uint64(1)).astype(np.int64) ^ -(u & np.uint64(1)).astype(np.int64)
+
+def _varints_con_signo(valores):
+    return b"".join(_varint((v << 1) ^ (v >> 63)) for v in valores.tolist())
+
+def _leer_varints_con_signo(buf, pos, n):
+    valores = []
+    for _ in range(n):
+        u, pos = _leer_varint(buf, pos)
+        valores.append((u >> 1) ^ -(u & 1))
+    return np.array(valores, dtype=np.int64), pos
+
+# -------------------------------------------------------------
+# Codigos de Rice: cada residuo u (en zigzag) se parte en el cociente
+# u >> k, en unario (q ceros y un 1), y los k bits bajos. Los unarios
+# de todo el subbloque van seguidos en un flujo de bits y los bits
+# bajos en otro, asi ambos se leen con NumPy sin recorrer bit a bit
+# -------------------------------------------------------------
+
+# Limites de las 2**p particiones de n residuos
+def _particiones(n, p):
+    return (np.arange((1 << p) + 1) * n) >> p
+
+# Funcion para elegir el orden de particion y el k de cada particion
+# que dan menos bits. Devuelve (bits, orden, ks)
+def _elegir_rice(u):
+    n = len(u)
+    orden = 0
+    while orden < ORDEN_MAX_PARTICION and n >> (orden + 1) >= MIN_PARTICION:
+        orden += 1
+    limites = _particiones(n, orden)
+    k = np.arange(MAX_RICE + 1, dtype=np.uint64)
+    cocientes = np.add.reduceat(u[:, None] >> k, limites[:-1], axis=0).astype(np.int64)
+    costos = cocientes + np.diff(limites)[:, None] * (1 + np.arange(MAX_RICE + 1))
+    mejor = None
+    # Las particiones de un orden son pares de particiones del siguiente
+    for p in range(orden, -1, -1):
+        bits = int(costos.min(axis=1).sum()) + 8 * len(costos)
+        if mejor is None or bits < mejor[0]:
+            mejor = (bits, p, costos.argmin(axis=1))
+        costos = costos[0::2] + costos[1::2]
+    return mejor
+
+# Estimacion rapida de los bits de Rice de un residuo (un solo k)
+def _estimar_rice(r):
+    u = _zigzag(r)
+    k = int(np.log2(u.mean() + 1)) if len(u) else 0
+    return int((u >> np.uint64(k)).sum()) + len(u) * (k + 1)
+
+def codificar_rice(r):
+    u = _zigzag(r)
+    _, p, ks = _elegir_rice(u)
+    limites = _particiones(len(u), p)
+    q = (u >> np.repeat(ks, np.diff(limites)).astype(np.uint64)).astype(np.int64)
+    unos = np.cumsum(q + 1) - 1
+    bits = np.zeros(unos[-1] + 1, dtype=np.uint8)
+    bits[unos] = 1
+    unario = np.packbits(bits).tobytes()
+    bajos = []
+    for a, b, k in zip(limites[:-1], limites[1:], ks.tolist()):
+        if k:
+            pesos = np.arange(k - 1, -1, -1, dtype=np.uint64)
+            bajos.append(((u[a:b, None] >> pesos) & np.uint64(1)).astype(np.uint8).ravel())
+    bajos = np.packbits(np.concatenate(bajos)).tobytes() if bajos else b""
+    return b"".join((bytes((p,)), ks.astype(np.uint8).tobytes(), _varint(len(unario)), unario, bajos))
+
+def decodificar_rice(buf, pos, n):
+    p = buf[pos]
+    ks = np.frombuffer(buf, dtype=np.uint8, count=1 << p, offset=pos + 1).astype(np.int64)
+    largo, pos = _leer_varint(buf, pos + 1 + (1 << p))
+    if pos + largo > len(buf):
+        raise ValueError("Archivo .arle truncado")
+    unos = np.flatnonzero(np.unpackbits(np.frombuffer(buf, dtype=np.uint8, count=largo, offset=pos)))[:n]
+    if len(unos) < n:
+        raise ValueError("Archivo .arle truncado")
+    pos += largo
+    limites = _particiones(n, p)
+    tamanos = np.diff(limites)
+    u = (np.diff(unos, prepend=-1) - 1).astype(np.uint64) << np.repeat(ks, tamanos).astype(np.uint64)
+    total = int((tamanos * ks).sum())
+    if pos + (total + 7) // 8 > len(buf):
+        raise ValueError("Archivo .arle truncado")
+    bajos = np.unpackbits(np.frombuffer(buf, dtype=np.uint8, count=(total + 7) // 8, offset=pos))
+    pos += (total + 7) // 8
+    inicio = 0
+    for a, b, k in zip(limites[:-1].tolist(), limites[1:].tolist(), ks.tolist()):
+        if k:
+            pesos = np.arange(k - 1, -1, -1, dtype=np.uint64)
+            tramo = bajos[inicio:inicio + (b - a) * k].reshape(b - a, k).astype(np.uint64)
+            u[a:b] |= (tramo << pesos).sum(axis=1, dtype=np.uint64)
+            inicio += (b - a) * k
+    return _deszigzag(u), pos
+
+# -------------------------------------------------------------
+# Prediccion. Los predictores fijos de orden k son las diferencias
+# k-esimas de la senal (se deshacen con sumas acumuladas); el LPC usa
+# coeficientes enteros calculados con Levinson-Durbin
+# -------------------------------------------------------------
+def _reconstruir_fijo(calentamiento, residuo, orden):
+    x = residuo
+    for j in range(orden - 1, -1, -1):
+        cabeza = np.diff(calentamiento, j)[0]
+        x = np.concatenate(([cabeza], cabeza + np.cumsum(x)))
+    return x
+
+# Ventana de Tukey (coseno en el primer y ultimo cuarto)
+def _ventana(n):
+    w = np.ones(n)
+    m = n // 4
+    if m:
+        rampa = 0.5 * (1 - np.cos(np.pi * np.arange(m) / m))
+        w[:m] = rampa
+        w[-m:] = rampa[::-1]
+    return w
+
+# Funcion para calcular los coeficientes LPC de orden 1 a orden_max.
+# Devuelve una lista de (coeficientes, error de prediccion)
+def coeficientes_lpc(x, orden_max):
+    v = x * _ventana(len(x))
+    autoc = np.array([np.dot(v[:len(v) - l], v[l:]) for l in range(orden_max + 1)])
+    error = autoc[0]
+    a = np.zeros(0)
+    resultado = []
+    for i in range(orden_max):
+        if error <= 0:
+            break
+        k = (autoc[i + 1] - np.dot(a, autoc[i:0:-1])) / error
+        a = np.append(a - k * a[::-1], k)
+        error *= 1 - k * k
+        resultado.append((a, error))
+    return resultado
+
+# Coeficientes enteros con PRECISION_LPC bits y su desplazamiento
+def _cuantizar_lpc(a):
+    maximo = np.abs(a).max()
+    if not maximo > 0:
+        return None
+    shift = min(MAX_SHIFT_LPC, PRECISION_LPC - 1 - np.frexp(maximo)[1])
+    if shift < 0:
+        return None
+    limite = 1 << (PRECISION_LPC - 1)
+    coefs = np.clip(np.round(a * (1 << shift)), -limite, limite - 1).astype(np.int64)
+    return coefs, shift
+
+def _residuo_lpc(x, coefs, shift):
+    orden = len(coefs)
+    prediccion = np.convolve(x, coefs)[orden - 1:len(x) - 1]
+    return x[orden:] - (prediccion >> shift)
+
+# La reconstruccion del LPC depende de las muestras anteriores, asi
+# que se hace muestra a muestra
+def _reconstruir_lpc(calentamiento, residuo, coefs, shift):
+    x = calentamiento.tolist()
+    coefs = coefs.tolist()[::-1]
+    orden = len(coefs)
+    for r in residuo.tolist():
+        x.append(r + (sum(map(mul, coefs, x[-orden:])) >> shift))
+    return np.array(x, dtype=np.int64)
+
+# Funcion para codificar las muestras de un canal en un subbloque:
+# se estiman los bits de cada predictor y se usa el mas chico
+def codificar_canal(x):
+    n = len(x)
+    if (x == x[0]).all():
+        return bytes((SUB_CONSTANTE,)) + _varints_con_signo(x[:1])
+    ancho, tipo_literal = _tipo_entero(x.min(), x.max())
+    literal = bytes((SUB_LITERAL, ancho)) + x.astype(tipo_literal).tobytes()
+    candidatos = []
+    for orden in range(min(ORDEN_MAX_FIJO, n - 1) + 1):
+        residuo = np.diff(x, orden)
+        candidatos.append((_estimar_rice(residuo) + 16 * orden, SUB_FIJO, orden, residuo, None))
+    if n > 2 * ORDEN_MAX_LPC:
+        for a, _ in coeficientes_lpc(x.astype(np.float64), ORDEN_MAX_LPC):
+            cuantizado = _cuantizar_lpc(a)
+            if cuantizado is None:
+                continue
+            residuo = _residuo_lpc(x, *cuantizado)
+            bits = _estimar_rice(residuo) + (16 + PRECISION_LPC) * len(a)
+            candidatos.append((bits, SUB_LPC, len(a), residuo, cuantizado))
+    _, tipo, orden, residuo, cuantizado = min(candidatos, key=lambda c: c[0])
+    partes = [bytes((tipo, orden))]
+    if tipo == SUB_LPC:
+        coefs, shift = cuantizado
+        partes.append(bytes((shift,)) + _varints_con_signo(coefs))
+    partes.append(_varints_con_signo(x[:orden]))
+    partes.append(codificar_rice(residuo))
+    subbloque = b"".join(partes)
+    return subbloque if len(subbloque) < len(literal) else literal
+
+def decodificar_canal(buf, pos, n, version=VERSION):
+    tipo = buf[pos]
+    pos += 1
+    if tipo == SUB_CONSTANTE:
+        valor, pos = _leer_varints_con_signo(buf, pos, 1)
+        return np.repeat(valor, n), pos
+    if tipo == SUB_LITERAL:
+        tipo_literal = MUESTRA
+        if version >= 2:
+            if buf[pos] not in TIPOS_ENTERO:
+                raise ValueError("Archivo .arle corrupto: literal de %d bytes" % buf[pos])
+            tipo_literal = TIPOS_ENTERO[buf[pos]]
+            pos += 1
+        fin = pos + n * tipo_literal.itemsize
+        if fin > len(buf):
+            raise ValueError("Archivo .arle truncado")
+        return np.frombuffer(buf, dtype=tipo_literal, count=n, offset=pos).astype(np.int64), fin
+    if tipo not in (SUB_FIJO, SUB_LPC):
+        raise ValueError("Subbloque de audio desconocido: %d" % tipo)
+    orden = buf[pos]
+    pos += 1
+    if tipo == SUB_LPC:
+        shift = buf[pos]
+        coefs, pos = _leer_varints_con_signo(buf, pos + 1, orden)
+    calentamiento, pos = _leer_varints_con_signo(buf, pos, orden)
+    residuo, pos = decodificar_rice(buf, pos, n - orden)
+    if tipo == SUB_FIJO:
+        return _reconstruir_fijo(calentamiento, residuo, orden), pos
+    return _reconstruir_lpc(calentamiento, residuo, coefs, shift), pos
+
+# Bloques independientes: se pueden comprimir y descomprimir en
+# procesos distintos
+def _comprimir_bloque_sin_perdida(frames, canales, ancho, mid_side):
+    samples = muestras_pcm(frames, ancho).astype(np.int64).reshape(-1, canales)
+    if mid_side:
+        samples = a_mid_side(samples)
+    partes = [_varint(len(samples))]
+    for c in range(canales):
+        partes.append(codificar_canal(samples[:, c]))
+    return b"".join(partes)
+
+def _descomprimir_bloque_sin_perdida(bloque, canales, ancho, mid_side, version=VERSION):
+    n, pos = _leer_varint(bloque, 0)
+    samples = np.empty((n, canales), dtype=np.int64)
+    for c in range(canales):
+        samples[:, c], pos = decodificar_canal(bloque, pos, n, version)
+    if mid_side:
+        samples = desde_mid_side(samples)
+    return frames_pcm(samples, ancho)
+
+# Funcion para comprimir un WAV sin perdida (prediccion + Rice). Con
+# procesos > 1 (o None = todos los nucleos) los bloques se comprimen
+# en paralelo; el .arle no depende de la cantidad de procesos. Con
+# mid_side=True un WAV estereo se guarda como mid y side
+def comprimir_wav_sin_perdida(wav_entrada, out_dir, tam_bloque=TAM_BLOQUE_LPC, procesos=1, mid_side=False):
+    basename = os.path.splitext(os.path.basename(wav_entrada))[0]
+    out_path = os.path.join(out_dir, basename + ".arle")
+    with wave.open(wav_entrada, 'rb') as wf:
+        params = wf.getparams()
+        _validar_params(params, mid_side)
+
+        def tareas():
+            while True:
+                frames = wf.readframes(tam_bloque)
+                if not frames:
+                    return
+                yield frames, params.nchannels, params.sampwidth, mid_side
+
+        n_bloques = 0
+        with open(out_path, 'wb') as f:
+            _escribir_cabecera(f, MODO_SIN_PERDIDA, params, mid_side)
+            for bloque in _mapa_ordenado(_comprimir_bloque_sin_perdida, tareas(), procesos):
+                f.write(_varint(len(bloque)))
+                f.write(bloque)
+                n_bloques += 1
+    n_samples = params.nframes * params.nchannels
+    stats = {
+        "samples": n_samples,
+        "bloques": n_bloques,
+        "bits_por_muestra": os.path.getsize(out_path) * 8 / n_samples,
+        "canales": params.nchannels,
+        "bits": params.sampwidth * 8,
+        "frecuencia": params.framerate
+    }
+    return out_path, stats
+
+# -------------------------------------------------------------
+# Lectura del .arle
+# -------------------------------------------------------------
+
+# .arle antiguo en pickle: devuelve los parametros del WAV y un
+# generador con las listas de corridas (valor, repeticiones)
+def _leer_pickle(f):
+    primero = pickle.load(f)
+    # Un solo pickle con (params, corridas); los parametros de wave
+    # son una tupla de 6 campos
+    if len(primero) == 2:
+        return primero[0], iter([primero[1]])
+
+    def bloques():
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+    return primero, bloques()
+
+# Leer la cabecera del .arle binario. Devuelve la version, el modo,
+# los parametros del WAV, si los canales estan en mid/side y la
+# posicion donde siguen los datos
+def _leer_cabecera(datos):
+    fin = len(MAGIC) + 2 + CABECERA.size
+    if len(datos) < fin:
+        raise ValueError("Archivo .arle truncado")
+    version, modo = datos[len(MAGIC)], datos[len(MAGIC) + 1]
+    if version > VERSION:
+        raise ValueError("Version de .arle no soportada: %d" % version)
+    if modo not in (MODO_RLE, MODO_SIN_PERDIDA):
+        raise ValueError("Modo de .arle desconocido: %d" % modo)
+    canales, ancho, frecuencia, frames = CABECERA.unpack(datos[len(MAGIC) + 2:fin])
+    params = ParametrosWav(canales, ancho, frecuencia, frames, 'NONE', 'not compressed')
+    opciones = 0
+    if version >= 2:
+        if len(datos) <= fin:
+            raise ValueError("Archivo .arle truncado")
+        opciones = datos[fin]
+        fin += 1
+    return version, modo, params, bool(opciones & OPCION_MID_SIDE), fin
+
+# Bloques del .arle desde "pos" hasta el final (sin copiarlos, salvo
+# que haya que enviarlos a otros procesos)
+def _bloques(datos, pos, copiar=False):
+    while pos < len(datos):
+        largo, pos = _leer_varint(datos, pos)
+        if pos + largo > len(datos):
+            raise ValueError("Archivo .arle truncado")
+        bloque = datos[pos:pos + largo]
+        yield bytes(bloque) if copiar else bloque
+        pos += largo
+
+# Frames del WAV (bytes) de cada formato de .arle
+def _frames_pickle(bloques):
+    for comprimido in bloques:
+        if not comprimido:
+            continue
+        valores = np.fromiter((val for val, _ in comprimido), dtype=np.int64, count=len(comprimido))
+        cuentas = np.fromiter((count for _, count in comprimido), dtype=np.int64, count=len(comprimido))
+        for samples in expandir_corridas(valores, cuentas):
+            yield samples.astype(MUESTRA).tobytes()
+
+def _frames_rle(datos, pos, version, params, mid_side):
+    paso, pos = _leer_varint(datos, pos)
+    if pos >= len(datos) or datos[pos] not in TIPOS_ENTERO:
+        raise ValueError("Archivo .arle truncado")
+    tipo = TIPOS_ENTERO[datos[pos]]
+    if version == 1:
+        for bloque in _bloques(datos, pos + 1):
+            for samples in expandir_corridas(*_corridas_v1(bloque, tipo, paso)):
+                yield samples.astype(MUESTRA).tobytes()
+        return
+    minimo, maximo = rango_pcm(params.sampwidth)
+    ultimos = [None] * params.nchannels if version >= 3 else None
+    for bloque in _bloques(datos, pos + 1):
+        x = _descomprimir_bloque_rle(bloque, tipo, paso, params.nchannels, ultimos)
+        if mid_side:
+            # Con mid y side cuantizados L o R pueden pasarse del rango
+            x = np.clip(desde_mid_side(x), minimo, maximo)
+        yield frames_pcm(x, params.sampwidth)
+
+# Funcion para descomprimir un archivo .arle y reconstruir el WAV.
+# Las muestras se escriben a medida que se leen los bloques; los .arle
+# sin perdida se decodifican en paralelo si procesos > 1
+def descomprimir_wav(arle_path, out_dir, procesos=1):
     basename = os.path.splitext(os.path.basename(arle_path))[0]
     out_path = os.path.join(out_dir, basename + "_recon.wav")
-    escribir_wav_samples(out_path, params, samples)
-    return out_path
\ No newline at end of file
+    with open(arle_path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            f.seek(0)
+            params, bloques = _leer_pickle(f)
+            with wave.open(out_path, 'wb') as wf:
+                wf.setparams(params)
+                for frames in _frames_pickle(bloques):
+                    wf.writeframes(frames)
+            return out_path
+
+    datos = _mapear(arle_path)
+    version, modo, params, mid_side, pos = _leer_cabecera(datos)
+    if modo == MODO_RLE:
+        frames_bloques = _frames_rle(datos, pos, version, params, mid_side)
+    else:
+        tareas = ((bloque, params.nchannels, params.sampwidth, mid_side, version)
+                  for bloque in _bloques(datos, pos, procesos != 1))
+        frames_bloques = _mapa_ordenado(_descomprimir_bloque_sin_perdida, tareas, procesos)
+    with wave.open(out_path, 'wb') as wf:
+        wf.setparams(params)
+        for frames in frames_bloques:
+            wf.writeframes(frames)
+    return out_path
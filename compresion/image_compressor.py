@@ -1,73 +1,505 @@
 import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image
+from . import text_compressor
+from ._util import _leer_varint, _varints, _leer_varints, _mapear
 
-def comprimir_imagen(path_entrada, direccion_salida):
-    img = Image.open(path_entrada).convert('RGB')
+# -------------------------------------------------------------
+# Formato del archivo .rle (version 5):
+#   MAGIC + version (1 byte)
+#   ancho, alto, lado de las teselas (varint)
+#   modo de la imagen (largo varint + nombre, p. ej. "RGB")
+#   bytes por indice de paleta (1 byte): 0 = sin paleta, 1 o 2
+#   con paleta: cantidad de colores (varint) + colores
+#   tabla de posiciones: inicio de cada tesela y fin de la ultima
+#   (8 bytes cada una, relativas al final de la tabla)
+#   teselas, por filas de izquierda a derecha
+# Cada tesela se codifica sola y empieza con su tipo (1 byte):
+#   TESELA_RLE: largo en bytes de los controles (varint) + controles
+#   (varints) + pixeles guardados (el pixel completo, o su indice en
+#   la paleta)
+#   TESELA_FILTRADA: bloque Huffman (text_compressor.comprimir_bytes)
+#   con el filtro de cada fila (1 byte por fila) y los residuos de los
+#   filtros codificados igual que una tesela RLE, byte por byte
+# Cada control es (largo - 1) * 2 + tipo: tipo 0 = corrida (un pixel
+# que se repite "largo" veces), tipo 1 = literal ("largo" pixeles
+# distintos seguidos, estilo PackBits). Las corridas no tienen limite.
+# Con la tabla se puede decodificar cada tesela por separado (en
+# paralelo, o solo las de un recorte). Se siguen pudiendo leer la
+# version 4 (teselas sin tipo), la version 3 (sin modo ni paleta), la
+# version 2 (ancho y alto y una sola tesela con la imagen completa) y
+# la version 1 (sin MAGIC: ancho, alto y cantidad de corridas en
+# 4 bytes, luego R, G, B y contador de 1 byte)
+# -------------------------------------------------------------
+MAGIC = b"RLE"
+VERSION = 5
+TAM_TESELA = 512                   # Lado de las teselas en pixeles
+POSICION_TESELA = np.dtype('<u8')  # Entrada de la tabla de posiciones
+
+# Imagenes con pocos colores: se guarda una paleta y cada pixel es un
+# indice de 1 byte (hasta 256 colores) o de 2 bytes (hasta 65536)
+TIPOS_INDICE = {1: np.dtype(np.uint8), 2: np.dtype('<u2')}
+MAX_COLORES = {1: 256, 2: 65536}
+
+TESELA_RLE = 0
+TESELA_FILTRADA = 1
+
+# Modos que se guardan tal cual (sin convertir a RGB) y sus bytes por pixel
+MODOS_NATIVOS = {"L": 1, "LA": 2, "RGB": 3, "RGBA": 4, "I;16": 2}
+
+# Corrida de la version 1: color RGB y contador de 1 byte
+CORRIDA_V1 = np.dtype([("color", "V3"), ("cantidad", np.uint8)])
+
+# -------------------------------------------------------------
+# Codificar los pixeles (arreglo (n, canales) de uint8) en corridas y
+# literales. Devuelve los controles (bytes), los pixeles guardados y
+# la cantidad de corridas encontradas
+# -------------------------------------------------------------
+def codificar_corridas(pixeles):
+    # pixeles: arreglo de una dimension, un elemento por pixel (indice
+    # de paleta, o el pixel completo como tipo de n bytes)
+    # Inicio de cada corrida: donde un pixel es distinto del anterior
+    inicios = np.flatnonzero(np.concatenate(([True], pixeles[1:] != pixeles[:-1])))
+    largos = np.diff(np.append(inicios, len(pixeles)))
+
+    # Los pixeles sueltos seguidos se juntan en un solo literal
+    sueltos = largos == 1
+    nuevo = np.ones(len(largos), dtype=bool)
+    nuevo[1:] = ~(sueltos[1:] & sueltos[:-1])
+    paquetes = np.flatnonzero(nuevo)
+    literal = sueltos[paquetes]
+    largo = np.where(literal, np.diff(np.append(paquetes, len(largos))), largos[paquetes])
+    controles = ((largo - 1) << 1) | literal
+    return _varints(controles), pixeles[inicios], len(inicios)
+
+
+def decodificar_corridas(controles, guardados):
+    valores = _leer_varints(controles)
+    literal = (valores & np.uint64(1)).astype(bool)
+    largo = (valores >> np.uint64(1)).astype(np.int64) + 1
+    # Pixeles guardados por paquete: 1 en una corrida, "largo" en un literal
+    por_paquete = np.where(literal, largo, 1)
+    if por_paquete.sum() != len(guardados):
+        raise ValueError("Archivo .rle corrupto: los controles no coinciden con los pixeles")
+    repeticiones = np.ones(len(guardados), dtype=np.int64)
+    posicion = np.cumsum(por_paquete) - por_paquete
+    repeticiones[posicion[~literal]] = largo[~literal]
+    return np.repeat(guardados, repeticiones)
+
+
+# -------------------------------------------------------------
+# Cada pixel (canales de 1 byte) como un solo entero, para comparar
+# y buscar colores rapido; y la conversion inversa
+# -------------------------------------------------------------
+def _empaquetar(pixeles):
+    valores = np.zeros(pixeles.shape[:-1], dtype=np.uint32)
+    for canal in range(pixeles.shape[-1]):
+        valores = (valores << np.uint32(8)) | pixeles[..., canal]
+    return valores
+
+
+def _desempaquetar(valores, canales):
+    desplazamientos = np.arange(canales - 1, -1, -1, dtype=np.uint32) * np.uint32(8)
+    return ((valores[..., None] >> desplazamientos) & np.uint32(0xFF)).astype(np.uint8)
+
+
+# -------------------------------------------------------------
+# Elegir como guardar los pixeles: con paleta si la imagen tiene
+# pocos colores y asi el archivo queda mas chico. Devuelve el plano de
+# pixeles (alto, ancho), los bytes por indice (0 = sin paleta), la
+# paleta y la cantidad de colores
+# -------------------------------------------------------------
+def _plano_pixeles(pixeles):
+    canales = pixeles.shape[-1]
+    valores = _empaquetar(pixeles)
+    plano = valores.ravel()
+    # Los colores se buscan solo en el inicio de cada corrida
+    inicios = np.flatnonzero(np.concatenate(([True], plano[1:] != plano[:-1])))
+    # Ordenar y quitar repetidos (mucho mas rapido que np.unique con
+    # millones de colores distintos)
+    colores = np.sort(plano[inicios])
+    colores = colores[np.concatenate(([True], colores[1:] != colores[:-1]))]
+
+    # Tamano aproximado: la paleta mas un indice (o un pixel) por corrida
+    costo = canales * len(inicios)
+    elegido = 0
+    for bytes_indice, maximo in MAX_COLORES.items():
+        costo_paleta = canales * len(colores) + bytes_indice * len(inicios)
+        if len(colores) <= maximo and costo_paleta < costo:
+            costo = costo_paleta
+            elegido = bytes_indice
+    if elegido:
+        indices = np.searchsorted(colores, valores).astype(TIPOS_INDICE[elegido])
+        return indices, elegido, _desempaquetar(colores, canales), len(colores)
+
+    return _plano_directo(pixeles), 0, None, len(colores)
+
+
+def _plano_directo(pixeles):
+    # Sin paleta: cada pixel completo como un tipo de n bytes
+    return np.ascontiguousarray(pixeles).view(f"V{pixeles.shape[-1]}")[..., 0]
+
+
+# -------------------------------------------------------------
+# Filtros por fila (como en PNG): cada byte se reemplaza por su
+# diferencia con una prediccion hecha con el pixel de la izquierda (a),
+# el de arriba (b) y el de arriba a la izquierda (c). En fotos y
+# degradados los residuos quedan cerca de 0 y se comprimen mucho mejor
+# -------------------------------------------------------------
+FILTRO_NINGUNO = 0
+FILTRO_SUB = 1       # a
+FILTRO_UP = 2        # b
+FILTRO_AVG = 3       # (a + b) / 2
+FILTRO_PAETH = 4     # el mas cercano a a + b - c
+
+def _paeth(a, b, c):
+    p = a + b - c
+    pa, pb, pc = np.abs(p - a), np.abs(p - b), np.abs(p - c)
+    return np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+
+
+def _predicciones(a, b, c):
+    return np.stack([np.zeros_like(a), a, b, (a + b) >> 1, _paeth(a, b, c)])
+
+
+def aplicar_filtros(pixeles):
+    # pixeles: (alto, ancho, canales) uint8. Devuelve el filtro de
+    # cada fila y los residuos (alto, ancho, canales) uint8
+    x = pixeles.astype(np.int16)
+    a = np.zeros_like(x)
+    a[:, 1:] = x[:, :-1]
+    b = np.zeros_like(x)
+    b[1:] = x[:-1]
+    c = np.zeros_like(x)
+    c[1:, 1:] = x[:-1, :-1]
+    residuos = ((x - _predicciones(a, b, c)) & 0xFF).astype(np.uint8)
+
+    # Heuristica de PNG: en cada fila, el filtro con la menor suma de
+    # los residuos tomados como bytes con signo
+    puntaje = np.abs(residuos.view(np.int8).astype(np.int32)).sum(axis=(2, 3))
+    filtros = np.argmin(puntaje, axis=0).astype(np.uint8)
+    return filtros, residuos[filtros, np.arange(len(filtros))]
+
+
+def quitar_filtros(filtros, residuos):
+    # Cada pixel depende del de la izquierda y de los de arriba: se
+    # reconstruye por diagonales (y + x constante), todas las filas a la
+    # vez. La imagen se guarda "inclinada" (diagonal k, fila y) para que
+    # cada diagonal y sus vecinos sean rebanadas contiguas; el borde
+    # (2 diagonales y 1 fila de ceros) hace de pixeles fuera de la imagen
+    alto, ancho, canales = residuos.shape
+    ys, xs = np.mgrid[0:alto, 0:ancho]
+    inclinados = np.zeros((alto + ancho - 1, alto, canales), dtype=np.int16)
+    inclinados[ys + xs, ys] = residuos
+    salida = np.zeros((alto + ancho + 1, alto + 1, canales), dtype=np.int16)
+    filtros = filtros.astype(np.intp)[:, None]
+    for k in range(alto + ancho - 1):
+        lo, hi = max(0, k - ancho + 1), min(alto, k + 1)
+        a = salida[k + 1, lo + 1:hi + 1]   # Izquierda: diagonal anterior, misma fila
+        b = salida[k + 1, lo:hi]           # Arriba: diagonal anterior, fila anterior
+        c = salida[k, lo:hi]               # Arriba a la izquierda
+        prediccion = np.choose(filtros[lo:hi], (0, a, b, (a + b) >> 1, _paeth(a, b, c)))
+        salida[k + 2, lo + 1:hi + 1] = (inclinados[k, lo:hi] + prediccion) & 0xFF
+    return salida[ys + xs + 2, ys + 1].astype(np.uint8)
+
+
+# -------------------------------------------------------------
+# Teselas: (x, y, ancho, alto) de cada una, por filas. Las del borde
+# derecho e inferior pueden ser mas chicas
+# -------------------------------------------------------------
+def _teselas(w, h, tesela):
+    return [(x, y, min(tesela, w - x), min(tesela, h - y))
+            for y in range(0, h, tesela) for x in range(0, w, tesela)]
+
+
+def _comprimir_tesela(bloque, canales=0):
+    # canales > 0: pixeles completos (sin paleta), tambien se prueban
+    # los filtros y queda la version mas chica
+    controles, guardados, corridas = codificar_corridas(bloque.ravel())
+    datos = bytes([TESELA_RLE]) + _varints([len(controles)]) + controles + guardados.tobytes()
+    if canales:
+        alto, ancho = bloque.shape
+        pixeles = np.ascontiguousarray(bloque).view(np.uint8).reshape(alto, ancho, canales)
+        filtros, residuos = aplicar_filtros(pixeles)
+        controles, guardados, _ = codificar_corridas(residuos.ravel())
+        crudo = filtros.tobytes() + _varints([len(controles)]) + controles + guardados.tobytes()
+        # Huffman no baja de la entropia de orden 0: si ni asi le gana
+        # a la tesela RLE, no vale la pena codificarla
+        if _bytes_entropia(crudo) < len(datos):
+            filtrada = bytes([TESELA_FILTRADA]) + text_compressor.comprimir_bytes(crudo)
+            if len(filtrada) < len(datos):
+                datos = filtrada
+    return datos, corridas
+
+
+def _bytes_entropia(datos):
+    cuentas = np.bincount(np.frombuffer(datos, dtype=np.uint8), minlength=256)
+    cuentas = cuentas[cuentas > 0]
+    return float((cuentas * np.log2(len(datos) / cuentas)).sum()) / 8
+
+
+def _descomprimir_tesela(datos, ancho, alto, tipo):
+    largo, pos = _leer_varint(datos, 0)
+    controles = datos[pos:pos + largo]
+    resto = datos[pos + largo:]
+    if len(controles) < largo or len(resto) % tipo.itemsize:
+        raise ValueError("Archivo .rle truncado")
+    pixeles = decodificar_corridas(controles, np.frombuffer(resto, dtype=tipo))
+    if len(pixeles) != ancho * alto:
+        raise ValueError(f"Error: se esperaban {ancho * alto} pixeles, se obtuvieron {len(pixeles)}")
+    return pixeles.reshape(alto, ancho)
+
+
+def _descomprimir_tesela_tipo(datos, ancho, alto, tipo):
+    # Version 5: el primer byte dice como esta codificada la tesela
+    if not datos:
+        raise ValueError("Archivo .rle truncado")
+    if datos[0] == TESELA_RLE:
+        return _descomprimir_tesela(datos[1:], ancho, alto, tipo)
+    if datos[0] != TESELA_FILTRADA:
+        raise ValueError(f"Tipo de tesela desconocido: {datos[0]}")
+    crudo = text_compressor.descomprimir_bytes(datos[1:])
+    filtros = np.frombuffer(crudo[:alto], dtype=np.uint8)
+    if len(filtros) < alto or filtros.max() > FILTRO_PAETH:
+        raise ValueError("Archivo .rle corrupto: filtro desconocido")
+    residuos = _descomprimir_tesela(crudo[alto:], ancho * tipo.itemsize, alto, np.dtype(np.uint8))
+    pixeles = quitar_filtros(filtros, residuos.reshape(alto, ancho, tipo.itemsize))
+    return pixeles.view(tipo)[..., 0]
+
+
+# -------------------------------------------------------------
+# Ejecutar "funcion" sobre cada tarea, en varios procesos si
+# procesos > 1 (None = todos los nucleos). Devuelve los resultados
+# en el mismo orden de las tareas
+# -------------------------------------------------------------
+def _mapa(funcion, tareas, procesos=1):
+    if procesos is None:
+        procesos = os.cpu_count() or 1
+    if procesos <= 1 or len(tareas) <= 1:
+        return [funcion(*tarea) for tarea in tareas]
+    with ProcessPoolExecutor(procesos) as pool:
+        return list(pool.map(funcion, *zip(*tareas)))
+
+
+# -------------------------------------------------------------
+# Abrir la imagen en su modo original si es uno de MODOS_NATIVOS. Los
+# demas se convierten al mas parecido (conservando la transparencia).
+# Devuelve la imagen y sus pixeles como (alto, ancho, bytes por pixel)
+# -------------------------------------------------------------
+def _abrir_imagen(path):
+    img = Image.open(path)
+    if img.mode not in MODOS_NATIVOS:
+        if img.mode == "1":
+            img = img.convert("L")
+        elif img.mode.startswith("I;16"):
+            img = img.convert("I;16")
+        elif "A" in img.getbands() or "transparency" in img.info:
+            img = img.convert("RGBA")
+        else:
+            img = img.convert("RGB")
+    pixeles = np.asarray(img)
+    if pixeles.dtype != np.uint8:
+        # I;16: cada pixel son 2 bytes (little-endian, como en el modo de PIL)
+        pixeles = pixeles.astype('<u2')
+    pixeles = pixeles.view(np.uint8).reshape(img.height, img.width, MODOS_NATIVOS[img.mode])
+    return img, pixeles
+
+
+# -------------------------------------------------------------
+# Funcion para comprimir una imagen a .rle. Si se pasa "stats" se
+# completa con datos para mostrar en la interfaz. Con procesos > 1
+# (o None) las teselas se comprimen en paralelo
+# -------------------------------------------------------------
+def comprimir_imagen(path_entrada, direccion_salida, stats=None, tesela=TAM_TESELA, procesos=1):
+    img, pixeles = _abrir_imagen(path_entrada)
     w, h = img.size
-    pixeles = list(img.getdata())
 
-    if not pixeles:
+    if not pixeles.size:
         raise ValueError("Imagen vacia")
 
-    # Aplicar RLE
-    compressed = []
-    colores = pixeles[0]
-    count = 1
+    # Con pocos colores se trabaja sobre los indices de la paleta
+    plano, bytes_indice, paleta, colores = _plano_pixeles(pixeles)
 
-    for pixel in pixeles[1:]:
-        if pixel == colores and count < 255:  # Límite 255 por byte
-            count += 1
-        else:
-            compressed.append((colores, count))
-            colores = pixel
-            count = 1
-    
-    # Agregar la ultima corrida
-    compressed.append((colores, count))
+    # Aplicar RLE a cada tesela (sin paleta se prueban tambien los filtros)
+    teselas = _teselas(w, h, tesela)
+    canales = 0 if bytes_indice else pixeles.shape[-1]
+    tareas = [(plano[y:y + alto, x:x + ancho], canales) for x, y, ancho, alto in teselas]
+    resultados = _mapa(_comprimir_tesela, tareas, procesos)
+
+    # Con paleta tambien se prueban los filtros sobre los pixeles
+    # completos (fotos y degradados suelen quedar mas chicos asi)
+    if bytes_indice:
+        directo = _plano_directo(pixeles)
+        tareas = [(directo[y:y + alto, x:x + ancho], pixeles.shape[-1]) for x, y, ancho, alto in teselas]
+        filtrados = _mapa(_comprimir_tesela, tareas, procesos)
+        if sum(len(datos) for datos, _ in filtrados) < sum(len(datos) for datos, _ in resultados) + paleta.nbytes:
+            resultados, bytes_indice = filtrados, 0
+
+    # Cabecera: tamano, modo, paleta y tabla con la posicion de cada tesela
+    modo = img.mode.encode('ascii')
+    cabecera = MAGIC + bytes([VERSION]) + _varints([w, h, tesela, len(modo)]) + modo + bytes([bytes_indice])
+    if bytes_indice:
+        cabecera += _varints([len(paleta)]) + paleta.tobytes()
+    posiciones = np.zeros(len(teselas) + 1, dtype=POSICION_TESELA)
+    posiciones[1:] = np.cumsum([len(datos) for datos, _ in resultados])
+    cabecera += posiciones.tobytes()
 
     # Guardar en formato binario puro
     basename = os.path.splitext(os.path.basename(path_entrada))[0]
     path_salida = os.path.join(direccion_salida, basename + ".rle")
 
     with open(path_salida, "wb") as f:
-        # Header: ancho, alto, número de corridas (12 bytes total)
-        f.write(w.to_bytes(4, 'big'))
-        f.write(h.to_bytes(4, 'big'))
-        f.write(len(compressed).to_bytes(4, 'big'))
-        
-        # Datos: cada corrida = 4 bytes (R + G + B + count)
-        for (r, g, b), count in compressed:
-            f.write(bytes([r, g, b, count]))
+        f.write(cabecera)
+        for datos, _ in resultados:
+            f.write(datos)
+
+    # Estadisticas opcionales para mostrar en la interfaz
+    if stats is not None:
+        stats["ancho"] = w
+        stats["alto"] = h
+        stats["modo"] = img.mode
+        stats["bytes_sin_comprimir"] = pixeles.nbytes
+        stats["corridas"] = sum(corridas for _, corridas in resultados)
+        stats["colores"] = colores
+        stats["paleta"] = len(paleta) if bytes_indice else 0
+        stats["teselas"] = len(teselas)
+        stats["bytes_cabecera"] = len(cabecera)
+        stats["bytes_datos"] = int(posiciones[-1])
 
     return path_salida
 
-def descomprimir_imagen(rle_path, out_dir):
-    with open(rle_path, "rb") as f:
-        # Leer header (12 bytes)
-        w = int.from_bytes(f.read(4), 'big')
-        h = int.from_bytes(f.read(4), 'big')
-        num_runs = int.from_bytes(f.read(4), 'big')
-        
-        # Leer corridas
-        pixeles = []
-        for _ in range(num_runs):
-            data = f.read(4)  # R, G, B, contador
-            if len(data) < 4:
-                break
-            r, g, b, count = data[0], data[1], data[2], data[3]
-            pixeles.extend([(r, g, b)] * count)
+
+def _leer_v1(datos):
+    if len(datos) < 12:
+        raise ValueError("Archivo .rle truncado")
+    # Header (12 bytes): ancho, alto y cantidad de corridas
+    w = int.from_bytes(datos[0:4], 'big')
+    h = int.from_bytes(datos[4:8], 'big')
+    num_runs = int.from_bytes(datos[8:12], 'big')
+
+    # Corridas vistas directamente como arreglo de registros (si el
+    # archivo esta truncado, solo las completas)
+    num_runs = min(num_runs, (len(datos) - 12) // CORRIDA_V1.itemsize)
+    corridas = np.frombuffer(datos, dtype=CORRIDA_V1, count=num_runs, offset=12)
+
+    # Expandir cada color segun su contador
+    pixeles = np.repeat(corridas["color"], corridas["cantidad"])
 
     # Verificar dimensiones
     pixeles_esperados = w * h
     if len(pixeles) != pixeles_esperados:
         raise ValueError(f"Error: se esperaban {pixeles_esperados} pixeles, se obtuvieron {len(pixeles)}")
+    return pixeles.view(np.uint8).reshape(h, w, 3)
+
+
+# -------------------------------------------------------------
+# Leer del .rle abierto la region (x, y, ancho, alto). Devuelve el modo
+# de la imagen y los pixeles (alto, ancho, bytes por pixel). Desde la
+# version 3 solo se leen y decodifican las teselas que tocan la region;
+# las versiones anteriores se decodifican completas y se recortan
+# -------------------------------------------------------------
+def _leer_region(datos, region=None, procesos=1):
+    if datos[:len(MAGIC)] != MAGIC:
+        # Formato antiguo sin MAGIC: empieza directamente con el ancho
+        version, pos = 1, 0
+        w, h = int.from_bytes(datos[0:4], 'big'), int.from_bytes(datos[4:8], 'big')
+    else:
+        version = datos[len(MAGIC)]
+        if version not in (2, 3, 4, VERSION):
+            raise ValueError(f"Version de archivo .rle no soportada: {version}")
+        w, pos = _leer_varint(datos, len(MAGIC) + 1)
+        h, pos = _leer_varint(datos, pos)
+    x, y, ancho, alto = region or (0, 0, w, h)
+    if ancho <= 0 or alto <= 0 or x < 0 or y < 0 or x + ancho > w or y + alto > h:
+        raise ValueError(f"Region fuera de la imagen de {w} x {h}: {(x, y, ancho, alto)}")
+
+    if version == 1:
+        return "RGB", _leer_v1(datos)[y:y + alto, x:x + ancho]
+    if version == 2:
+        plano = _descomprimir_tesela(datos[pos:], w, h, np.dtype("V3"))
+        return "RGB", plano.view(np.uint8).reshape(h, w, 3)[y:y + alto, x:x + ancho]
+
+    # Modo y paleta (la version 3 es siempre RGB sin paleta)
+    tesela, pos = _leer_varint(datos, pos)
+    modo = "RGB"
+    paleta = None
+    if version >= 4:
+        largo, pos = _leer_varint(datos, pos)
+        modo = bytes(datos[pos:pos + largo]).decode('ascii')
+        pos += largo
+        if modo not in MODOS_NATIVOS:
+            raise ValueError(f"Modo de imagen no soportado: {modo}")
+    canales = MODOS_NATIVOS[modo]
+    tipo = np.dtype(f"V{canales}")
+    if version >= 4:
+        bytes_indice = datos[pos]
+        pos += 1
+        if bytes_indice:
+            n_colores, pos = _leer_varint(datos, pos)
+            paleta = np.frombuffer(datos[pos:pos + n_colores * canales], dtype=np.uint8).reshape(-1, canales)
+            pos += n_colores * canales
+            tipo = TIPOS_INDICE[bytes_indice]
+
+    teselas = _teselas(w, h, tesela)
+    fin_tabla = pos + (len(teselas) + 1) * POSICION_TESELA.itemsize
+    if len(datos) < fin_tabla:
+        raise ValueError("Archivo .rle truncado")
+    posiciones = np.frombuffer(datos[pos:fin_tabla], dtype=POSICION_TESELA).astype(np.int64) + fin_tabla
+    if posiciones[-1] > len(datos):
+        raise ValueError("Archivo .rle truncado")
+
+    # Teselas que tocan la region (x0/y0: tesela de la esquina superior izquierda)
+    por_fila = -(-w // tesela)
+    x0, y0 = x // tesela, y // tesela
+    x1, y1 = (x + ancho - 1) // tesela, (y + alto - 1) // tesela
+    elegidas = [ty * por_fila + tx for ty in range(y0, y1 + 1) for tx in range(x0, x1 + 1)]
+
+    # Rebanadas del buffer: no se copian, salvo que haya que enviar
+    # las teselas a otros procesos
+    tareas = []
+    for i in elegidas:
+        bloque = datos[posiciones[i]:posiciones[i + 1]]
+        tareas.append((bloque if procesos == 1 else bytes(bloque), teselas[i][2], teselas[i][3], tipo))
+
+    # Decodificar (en paralelo si procesos > 1) y copiar la parte de cada tesela
+    funcion = _descomprimir_tesela_tipo if version >= 5 else _descomprimir_tesela
+    salida = np.empty((alto, ancho), dtype=tipo)
+    for i, bloque in zip(elegidas, _mapa(funcion, tareas, procesos)):
+        tx, ty = teselas[i][:2]
+        ax, ay = max(x, tx), max(y, ty)
+        bx, by = min(x + ancho, tx + teselas[i][2]), min(y + alto, ty + teselas[i][3])
+        salida[ay - y:by - y, ax - x:bx - x] = bloque[ay - ty:by - ty, ax - tx:bx - tx]
+
+    # Indices -> colores de la paleta; pixeles completos -> canales
+    if paleta is not None:
+        if len(paleta) and salida.max() >= len(paleta):
+            raise ValueError("Archivo .rle corrupto: indice fuera de la paleta")
+        return modo, paleta[salida]
+    return modo, salida.view(np.uint8).reshape(alto, ancho, canales)
+
+
+def _imagen(modo, pixeles):
+    # Imagen de PIL directamente desde el buffer de pixeles
+    alto, ancho = pixeles.shape[:2]
+    return Image.frombuffer(modo, (ancho, alto), np.ascontiguousarray(pixeles), "raw", modo, 0, 1)
+
+
+def descomprimir_imagen(rle_path, out_dir, procesos=1):
+    img = _imagen(*_leer_region(_mapear(rle_path), procesos=procesos))
 
-    # Crear imagen
-    img = Image.new("RGB", (w, h))
-    img.putdata(pixeles)
-    
     nombre_base = os.path.splitext(os.path.basename(rle_path))[0]
     ruta_salida = os.path.join(out_dir, nombre_base + "_descomprimido.png")
     img.save(ruta_salida)
-    
-    return ruta_salida
\ No newline at end of file
+
+    return ruta_salida
+
+
+# -------------------------------------------------------------
+# Funcion para obtener solo un recorte de la imagen (x, y = esquina
+# superior izquierda). Devuelve una imagen de PIL en el modo original;
+# en un .rle por teselas el tiempo depende del area pedida, no de la
+# imagen completa
+# -------------------------------------------------------------
+def recortar_imagen(rle_path, x, y, ancho, alto, procesos=1):
+    return _imagen(*_leer_region(_mapear(rle_path), (x, y, ancho, alto), procesos))
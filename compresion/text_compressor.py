@@ -1,19 +1,28 @@
 # Importacion de modulos necesarios
-import os, pickle, struct
-from collections import Counter
+import os, re, math, pickle, struct, time, bisect, hashlib
+from collections import Counter, OrderedDict
 import heapq
+import numpy as np
+from ._util import _varint, _leer_varint, _varints, _leer_varints, _mapear, _mapa_ordenado
 
 # -------------------------------------------------------------
 # Clase Node: representa un nodo del arbol de Huffman
 # -------------------------------------------------------------
 class Node:
+    # __slots__ evita un __dict__ por nodo: con alfabetos grandes (texto
+    # Unicode o tokens de palabras) el arbol ocupa mucho menos memoria
+    __slots__ = ("char", "freq", "left", "right")
+
     def __init__(self, char=None, freq=0):
         self.char = char       # Caracter almacenado en el nodo (None si es nodo interno)
         self.freq = freq       # Frecuencia de aparicion del caracter
         self.left = None       # Hijo izquierdo
         self.right = None      # Hijo derecho
 
-    # Metodo especial para que los nodos sean comparables en la cola de prioridad
+    # Metodo especial para que los nodos sean comparables en la cola de prioridad.
+    # Los empates se dejan tal cual (solo cuenta la frecuencia): los .bin en
+    # formato pickle reconstruyen el arbol desde las frecuencias y necesitan
+    # exactamente la misma forma de arbol que cuando se comprimieron
     def __lt__(self, other):
         return self.freq < other.freq
 
@@ -56,48 +65,449 @@ def construir_codigo(node, prefix="", table=None):
     if node is None:
         return table
 
-    # Si el nodo es una hoja, asignar el codigo binario actual
-    if node.char is not None:
-        # Caso especial: si solo hay un caracter, se usa "0" como codigo
-        table[node.char] = prefix or "0"
-    else:
-        # Recorrer rama izquierda (bit 0)
-        construir_codigo(node.left, prefix + "0", table)
-        # Recorrer rama derecha (bit 1)
-        construir_codigo(node.right, prefix + "1", table)
+    # Recorrido iterativo con una pila explicita (sin recursion, asi un
+    # arbol profundo no choca con el limite de recursion de Python).
+    # Se apila primero la rama derecha para visitar antes la izquierda
+    # y conservar el mismo orden de la tabla que el recorrido recursivo
+    pila = [(node, prefix)]
+    while pila:
+        node, prefix = pila.pop()
+        # Si el nodo es una hoja, asignar el codigo binario actual
+        if node.char is not None:
+            # Caso especial: si solo hay un caracter, se usa "0" como codigo
+            table[node.char] = prefix or "0"
+        else:
+            pila.append((node.right, prefix + "1"))   # Rama derecha (bit 1)
+            pila.append((node.left, prefix + "0"))    # Rama izquierda (bit 0)
 
     return table
 
 
+# -------------------------------------------------------------
+# Funcion auxiliar: pasar la tabla de codigos ("0101") a pares
+# (codigo como entero, longitud en bits)
+# -------------------------------------------------------------
+def codigos_enteros(codes):
+    return {sym: (int(code, 2), len(code)) for sym, code in codes.items()}
+
+
+# -------------------------------------------------------------
+# Funcion para empaquetar los codigos directamente en bytes usando
+# un acumulador entero (sin construir una cadena de '0' y '1')
+# -------------------------------------------------------------
+def empaquetar_bits(simbolos, codigos):
+    out = bytearray()
+    acc = 0         # Bits pendientes de escribir
+    nacc = 0        # Cantidad de bits pendientes
+    for sym in simbolos:
+        code, l = codigos[sym]
+        acc = (acc << l) | code
+        nacc += l
+        # Volcar 32 bits completos al buffer de salida
+        if nacc >= 32:
+            nacc -= 32
+            out += (acc >> nacc).to_bytes(4, 'big')
+            acc &= (1 << nacc) - 1
+
+    # Volcar los bytes completos restantes y el ultimo byte parcial
+    resto = nacc & 7
+    out += (acc >> resto).to_bytes(nacc >> 3, 'big')
+    if resto:
+        out.append((acc & ((1 << resto) - 1)) << (8 - resto))
+
+    # Mismo criterio de padding que bitstring_a_bytes (8 = sin relleno)
+    padding = 8 - resto
+    return bytes(out), padding
+
+
 # -------------------------------------------------------------
 # Funcion auxiliar: convertir cadena de bits a bytes
 # -------------------------------------------------------------
 def bitstring_a_bytes(bitstring):
-    # Rellenar con ceros a la izquierda hasta que sea multiplo de 8
+    # Rellenar con ceros a la derecha hasta que sea multiplo de 8
     padding = 8 - (len(bitstring) % 8)
     if padding != 8:
         bitstring = bitstring + '0' * padding
-    
-    # Convertir grupos de 8 bits a bytes
-    bytes_list = bytearray()
-    for i in range(0, len(bitstring), 8):
-        byte = bitstring[i:i+8]
-        bytes_list.append(int(byte, 2))
-    
-    return bytes(bytes_list), padding
+
+    # Convertir toda la cadena de una sola vez (base 2 es lineal)
+    if not bitstring:
+        return b"", padding
+    return int(bitstring, 2).to_bytes(len(bitstring) // 8, 'big'), padding
 
 
 # -------------------------------------------------------------
 # Funcion auxiliar: convertir bytes a cadena de bits
 # -------------------------------------------------------------
 def bytes_a_bitstring(data, padding):
-    bitstring = ''.join(format(byte, '08b') for byte in data)
+    if not data:
+        return ""
+    bitstring = bin(int.from_bytes(data, 'big'))[2:].zfill(len(data) * 8)
     # Remover el padding agregado
     if padding != 8:
         bitstring = bitstring[:-padding]
     return bitstring
 
 
+# -------------------------------------------------------------
+# Tabla de decodificacion: permite resolver un simbolo leyendo
+# varios bits a la vez en lugar de avanzar bit por bit
+# -------------------------------------------------------------
+TABLA_BITS = 12   # Bits que se resuelven por cada consulta a la tabla
+
+def _llenar_tabla(entradas, bits):
+    # entradas: lista de (simbolo, codigo como entero, longitud en bits)
+    ancho = min(bits, max(l for _, _, l in entradas))
+    tabla = [None] * (1 << ancho)
+    grupos = {}
+    for sym, code, l in entradas:
+        if l <= ancho:
+            # El codigo cabe en la tabla: se replica en todas las
+            # posiciones que empiezan con el
+            base = code << (ancho - l)
+            for i in range(base, base + (1 << (ancho - l))):
+                tabla[i] = (sym, l)
+        else:
+            # Codigo largo: se agrupa por prefijo para una subtabla
+            prefijo = code >> (l - ancho)
+            resto = code & ((1 << (l - ancho)) - 1)
+            grupos.setdefault(prefijo, []).append((sym, resto, l - ancho))
+
+    # Las entradas con longitud 0 apuntan a la subtabla del prefijo
+    for prefijo, sub in grupos.items():
+        tabla[prefijo] = (_llenar_tabla(sub, bits), 0)
+
+    return ancho, tabla
+
+
+def _tabla_multiple(ancho, tabla, unir):
+    # Para cada indice de la tabla principal se decodifican todos los
+    # simbolos completos que caben en sus "ancho" bits
+    mascara = (1 << ancho) - 1
+    multiple = [None] * (1 << ancho)
+    for i in range(1 << ancho):
+        syms = []
+        usados = 0
+        while usados < ancho:
+            entrada = tabla[(i << usados) & mascara]
+            if entrada is None or not entrada[1] or entrada[1] > ancho - usados:
+                break
+            syms.append(entrada[0])
+            usados += entrada[1]
+        if syms:
+            multiple[i] = (unir(syms), usados, len(syms))
+    return multiple
+
+
+def construir_tabla_decodificacion(codigos, bits=TABLA_BITS, unir=''.join):
+    # codigos: diccionario simbolo -> (codigo entero, longitud)
+    # unir=None omite la tabla de varios simbolos por consulta
+    if not codigos:
+        return None
+    entradas = [(sym, code, l) for sym, (code, l) in codigos.items()]
+    ancho, tabla = _llenar_tabla(entradas, bits)
+    max_len = max(l for _, _, l in entradas)
+    multiple = _tabla_multiple(ancho, tabla, unir) if unir else None
+    return ancho, tabla, multiple, max(max_len, ancho)
+
+
+# -------------------------------------------------------------
+# Cache LRU de tablas de decodificacion: muchos archivos pequenos con
+# la misma tabla de codigos no vuelven a construirla. Solo se usa con
+# una clave (la tabla serializada, o el identificador de una tabla
+# compartida); el limite es la cantidad de entradas guardadas (codigos
+# y casillas de las tablas), no la cantidad de tablas
+# -------------------------------------------------------------
+CACHE_TABLAS = 128             # Longitudes por huella guardadas como maximo
+ESCALON_HUELLA = 3             # Bits de probabilidad por escalon de la huella
+TOLERANCIA_CACHE = 0.01        # Costo extra aceptado con longitudes cacheadas
+MAX_ENTRADAS_CACHE = 1 << 17   # Entradas de tablas de decodificacion como maximo
+_tablas_cacheadas = OrderedDict()   # (clave, unir) -> (tabla, entradas)
+
+def tabla_decodificacion(codigos, unir=''.join, clave=None):
+    if clave is None:
+        return construir_tabla_decodificacion(codigos, unir=unir)
+    clave = (clave, unir)
+    if clave in _tablas_cacheadas:
+        _tablas_cacheadas.move_to_end(clave)
+        return _tablas_cacheadas[clave][0]
+    tabla = construir_tabla_decodificacion(codigos, unir=unir)
+    entradas = len(codigos)
+    if tabla is not None:
+        entradas += len(tabla[1]) * (2 if tabla[2] else 1)
+    if entradas <= MAX_ENTRADAS_CACHE:
+        _tablas_cacheadas[clave] = (tabla, entradas)
+        # Sacar las menos usadas hasta volver a entrar en el limite
+        while sum(n for _, n in _tablas_cacheadas.values()) > MAX_ENTRADAS_CACHE:
+            _tablas_cacheadas.popitem(last=False)
+    return tabla
+
+
+# -------------------------------------------------------------
+# Funcion para decodificar n simbolos directamente desde los bytes,
+# empezando en el bit inicio_bits. Devuelve una lista de fragmentos
+# (ya unidos con "unir")
+# -------------------------------------------------------------
+def decodificar_bytes(data, n_simbolos, tabla, inicio_bits=0):
+    decoded = []
+    if not n_simbolos:
+        return decoded
+    append = decoded.append
+    ancho0, entradas0, multiple, max_len = tabla
+    mascara0 = (1 << ancho0) - 1
+    acc = 0         # Acumulador de bits pendientes
+    nacc = 0        # Cantidad de bits validos en el acumulador
+    pos = inicio_bits >> 3
+    total = len(data)
+    if inicio_bits & 7:
+        # Descartar los bits del primer byte anteriores al inicio
+        nacc = 8 - (inicio_bits & 7)
+        acc = data[pos] & ((1 << nacc) - 1)
+        pos += 1
+    count = 0
+
+    while count < n_simbolos:
+        # Recargar el acumulador de 7 en 7 bytes; al final del
+        # buffer se completa con ceros (el padding)
+        while nacc < max_len:
+            if pos < total:
+                chunk = data[pos:pos + 7]
+                pos += len(chunk)
+                acc = (acc << (8 * len(chunk))) | int.from_bytes(chunk, 'big')
+                nacc += 8 * len(chunk)
+            else:
+                acc <<= 56
+                nacc += 56
+
+        # Camino rapido: varios simbolos cortos en una sola consulta
+        # (solo si no se pasa de la cantidad de simbolos pedida)
+        idx = (acc >> (nacc - ancho0)) & mascara0
+        if n_simbolos - count >= ancho0:
+            entrada = multiple[idx]
+            if entrada is not None:
+                append(entrada[0])
+                nacc -= entrada[1]
+                count += entrada[2]
+                acc &= (1 << nacc) - 1
+                continue
+
+        # Un solo simbolo, recorriendo subtablas si el codigo es largo
+        sym, l = entradas0[idx]
+        if not l:
+            nacc -= ancho0
+            ancho, entradas = sym
+            while True:
+                sym, l = entradas[(acc >> (nacc - ancho)) & ((1 << ancho) - 1)]
+                if l:
+                    break
+                nacc -= ancho
+                ancho, entradas = sym
+        nacc -= l
+        append(sym)
+        count += 1
+        acc &= (1 << nacc) - 1
+
+    return decoded
+
+
+# -------------------------------------------------------------
+# Modo bytes con NumPy: los codigos se empaquetan todos a la vez y se
+# decodifican con una tabla indexada por los proximos bits. Es el
+# mismo formato que empaquetar_bits / decodificar_bytes
+# -------------------------------------------------------------
+MAX_BITS_BYTES = 20   # Codigos mas largos no caben en la tabla de NumPy
+SIMBOLOS_TRAMO = 512  # Simbolos por tramo (aprox.) al decodificar en paralelo
+
+def _empaquetar_bytes(simbolos, codigos):
+    codigo = np.zeros(256, dtype=np.uint64)
+    largo = np.zeros(256, dtype=np.int64)
+    for sym, (code, l) in codigos.items():
+        codigo[sym] = code
+        largo[sym] = l
+    largos = largo[simbolos]
+    fin = np.cumsum(largos)
+    inicio = fin - largos
+    # Cada codigo cae en una palabra de 32 bits o entre dos: se alinea en
+    # 64 bits y cada mitad se suma a su palabra (los bits no se pisan,
+    # asi que sumar es lo mismo que un OR)
+    valor = codigo[simbolos] << (64 - (inicio & 31) - largos).astype(np.uint64)
+    palabra = inicio >> 5
+    n_palabras = int(palabra[-1]) + 2
+    salida = np.bincount(palabra, weights=valor >> np.uint64(32), minlength=n_palabras)
+    salida += np.bincount(palabra + 1, weights=valor & np.uint64(0xFFFFFFFF), minlength=n_palabras)
+    # Mismo criterio de padding que empaquetar_bits (8 = sin relleno)
+    total = int(fin[-1])
+    return salida.astype('>u4').tobytes()[:(total + 7) // 8], 8 - total % 8
+
+
+def _decodificar_bytes_np(data, n_simbolos, codigos, inicio_bits=0):
+    # Tabla indexada por los proximos "ancho" bits: simbolo en el byte
+    # bajo y largo del codigo en el alto (invalido: avanzar 1 bit)
+    ancho = max(l for _, l in codigos.values())
+    tabla = np.full(1 << ancho, 1 << 8, dtype=np.uint16)
+    for sym, (code, l) in codigos.items():
+        tabla[code << (ancho - l):(code + 1) << (ancho - l)] = sym | (l << 8)
+    desplazamiento = np.uint32(32 - ancho)
+    # Solo los bytes que pueden tener los n simbolos desde inicio_bits
+    fin_bits = min(8 * len(data), inicio_bits + n_simbolos * ancho)
+    data = data[inicio_bits >> 3:(fin_bits + 7) >> 3]
+    total = fin_bits - (inicio_bits >> 3) * 8
+    inicio_bits &= 7
+    # Palabra de 32 bits que empieza en cada byte (con relleno al final)
+    buf = np.frombuffer(bytes(data) + bytes(8), dtype=np.uint8).astype(np.uint32)
+    palabras = (buf[:-3] << 24) | (buf[1:-2] << 16) | (buf[2:-1] << 8) | buf[3:]
+
+    # Los bits se parten en tramos y cada tramo se decodifica a la vez
+    # (un "carril" por tramo) desde el primer codigo que empieza en el.
+    # Al principio ese inicio se adivina (el borde del tramo); los
+    # codigos de Huffman se resincronizan enseguida, asi que el final
+    # del carril anterior da el inicio correcto y solo se repiten los
+    # carriles cuyo inicio cambio (el primer carril siempre es correcto)
+    tramo = max(ancho, (total - inicio_bits) * SIMBOLOS_TRAMO // n_simbolos)
+    limites = np.append(np.arange(inicio_bits, total, tramo), total)
+    inicios = limites[:-1].copy()
+    finales = np.zeros_like(inicios)
+    carriles = [None] * len(inicios)
+    pendientes = np.arange(len(inicios))
+    while len(pendientes):
+        p = inicios[pendientes].copy()
+        fin = limites[pendientes + 1]
+        simbolos, validos = [], []
+        activos = p < fin
+        while activos.any():
+            entrada = tabla[(palabras[p >> 3] << (p & 7).astype(np.uint32)) >> desplazamiento]
+            simbolos.append(entrada)
+            validos.append(activos)
+            p = np.where(activos, p + (entrada >> 8), p)
+            activos = p < fin
+        simbolos = np.stack(simbolos, axis=1).astype(np.uint8)
+        validos = np.stack(validos, axis=1)
+        for j, carril in enumerate(pendientes.tolist()):
+            carriles[carril] = simbolos[j][validos[j]]
+        finales[pendientes] = p
+        pendientes = np.flatnonzero(inicios[1:] != finales[:-1]) + 1
+        inicios[pendientes] = finales[pendientes - 1]
+    # Simbolos de cada carril en orden; los ultimos pueden venir del relleno
+    salida = np.concatenate(carriles)
+    if len(salida) < n_simbolos:
+        raise ValueError("Bloque comprimido truncado")
+    return salida[:n_simbolos].tobytes()
+
+
+# -------------------------------------------------------------
+# Huffman canonico: a partir de las longitudes de codigo se
+# reconstruyen los codigos sin necesidad del arbol
+# -------------------------------------------------------------
+def longitudes_codigo(freq):
+    # Longitud del codigo de cada simbolo segun el arbol de Huffman.
+    # Solo hace falta la profundidad de cada hoja, asi que se recorre el
+    # arbol por niveles sin armar los prefijos "0101" de construir_codigo
+    longitudes = {}
+    nivel = [construir_arbol(freq)]
+    if nivel[0] is None:
+        return longitudes
+    if nivel[0].char is not None:
+        return {nivel[0].char: 1}
+    profundidad = 0
+    while nivel:
+        siguiente = []
+        for node in nivel:
+            if node.char is not None:
+                longitudes[node.char] = profundidad
+            else:
+                siguiente.append(node.left)
+                siguiente.append(node.right)
+        nivel = siguiente
+        profundidad += 1
+    return longitudes
+
+
+def codigos_canonicos(longitudes):
+    # Asignar codigos consecutivos ordenando por (longitud, simbolo)
+    codigos = {}
+    code = 0
+    prev_len = 0
+    for sym, l in sorted(longitudes.items(), key=lambda x: (x[1], x[0])):
+        code <<= l - prev_len
+        codigos[sym] = (code, l)
+        code += 1
+        prev_len = l
+    return codigos
+
+
+# -------------------------------------------------------------
+# Longitudes de codigo limitadas a max_bits (algoritmo package-merge).
+# Da el codigo optimo entre los que no superan max_bits, asi la tabla
+# de decodificacion queda pequena y cada simbolo se resuelve en una
+# cantidad acotada de consultas
+# -------------------------------------------------------------
+def longitudes_limitadas(freq, max_bits):
+    simbolos = sorted(freq, key=lambda s: (freq[s], s))
+    n = len(simbolos)
+    if n == 0:
+        return {}
+    if n == 1:
+        return {simbolos[0]: 1}
+    if n > (1 << max_bits):
+        raise ValueError(f"{n} simbolos no caben en codigos de {max_bits} bits")
+
+    # Hojas: (peso, indice del simbolo); paquetes: (peso, hijo a, hijo b)
+    hojas = [(freq[s], i) for i, s in enumerate(simbolos)]
+    fila = hojas
+    for _ in range(max_bits - 1):
+        # Empaquetar de a pares y mezclar con las hojas por peso
+        paquetes = [(fila[k][0] + fila[k + 1][0], fila[k], fila[k + 1])
+                    for k in range(0, len(fila) - 1, 2)]
+        fila = sorted(hojas + paquetes, key=lambda x: x[0])
+
+    # Cada vez que una hoja aparece entre los 2n-2 elementos elegidos
+    # su codigo crece en un bit
+    largos = [0] * n
+    pila = fila[:2 * n - 2]
+    while pila:
+        item = pila.pop()
+        if len(item) == 2:
+            largos[item[1]] += 1
+        else:
+            pila.append(item[1])
+            pila.append(item[2])
+    return {s: largos[i] for i, s in enumerate(simbolos)}
+
+
+# -------------------------------------------------------------
+# Funcion auxiliar: bits totales que ocupan los datos con esas longitudes
+# -------------------------------------------------------------
+def bits_codificados(freq, longitudes):
+    return sum(freq[s] * longitudes[s] for s in freq)
+
+
+# -------------------------------------------------------------
+# Serializar / leer la tabla de longitudes de codigo.
+# Cada entrada: diferencia con el simbolo anterior (varint) + longitud (1 byte).
+# Los simbolos son caracteres (modo texto) o enteros 0-255 (modo bytes)
+# -------------------------------------------------------------
+def serializar_longitudes(longitudes):
+    out = bytearray(_varint(len(longitudes)))
+    prev = -1
+    for sym in sorted(longitudes):
+        punto = sym if isinstance(sym, int) else ord(sym)
+        out += _varint(punto - prev - 1)
+        out.append(longitudes[sym])
+        prev = punto
+    return bytes(out)
+
+
+def leer_longitudes(buf, pos, texto=True):
+    n, pos = _leer_varint(buf, pos)
+    longitudes = {}
+    prev = -1
+    for _ in range(n):
+        delta, pos = _leer_varint(buf, pos)
+        prev += delta + 1
+        longitudes[chr(prev) if texto else prev] = buf[pos]
+        pos += 1
+    return longitudes, pos
+
+
 # -------------------------------------------------------------
 # Funcion para comprimir texto usando Huffman
 # -------------------------------------------------------------
@@ -108,74 +518,1046 @@ def comprimir_texto(txt):
     tree = construir_arbol(freq)
     # Generar la tabla de codigos
     codes = construir_codigo(tree)
-    # Reemplazar cada caracter por su codigo binario correspondiente
-    bitstring = ''.join(codes[ch] for ch in txt)
-    # Convertir a bytes
-    data_bytes, padding = bitstring_a_bytes(bitstring)
+    # Escribir el codigo de cada caracter directamente en bytes
+    data_bytes, padding = empaquetar_bits(txt, codigos_enteros(codes))
     # Devolver frecuencias, bytes comprimidos y padding
     return freq, data_bytes, padding
 
 
 # -------------------------------------------------------------
-# Funcion para comprimir un archivo de texto a binario (.bin)
+# Longitudes de los codigos canonicos: solo hace falta guardar la
+# longitud del codigo de cada simbolo (caracter o byte 0-255)
+# -------------------------------------------------------------
+def calcular_longitudes(freq, max_bits=None):
+    longitudes = longitudes_codigo(freq)
+    # Limitar la longitud maxima solo si el arbol la supera
+    if max_bits and max(longitudes.values(), default=0) > max_bits:
+        longitudes = longitudes_limitadas(freq, max_bits)
+    return longitudes
+
+
+# -------------------------------------------------------------
+# Cache LRU de longitudes por "huella" de frecuencias: cada simbolo con
+# su probabilidad (cuenta / total) en escala logaritmica, en escalones
+# de ESCALON_HUELLA bits. No depende del tamano, asi que archivos con la
+# misma forma de distribucion comparten la tabla (y su tabla de
+# decodificacion). Se guardan las longitudes exactas del primer bloque
+# con cada huella; los siguientes solo las usan si cuestan a lo sumo
+# TOLERANCIA_CACHE mas que sus propias longitudes
+# -------------------------------------------------------------
+_longitudes_cacheadas = OrderedDict()   # (huella, max_bits) -> longitudes
+
+def huella_frecuencias(freq):
+    total = sum(freq.values())
+    return tuple(sorted((sym, round(math.log2(total / n) / ESCALON_HUELLA))
+                        for sym, n in freq.items()))
+
+
+def longitudes_cacheadas(freq, max_bits=None):
+    # Devuelve (longitudes, True si salieron de la cache)
+    longitudes = calcular_longitudes(freq, max_bits)
+    clave = (huella_frecuencias(freq), max_bits)
+    candidatas = _longitudes_cacheadas.get(clave)
+    if candidatas is None:
+        _longitudes_cacheadas[clave] = longitudes
+        if len(_longitudes_cacheadas) > CACHE_TABLAS:
+            _longitudes_cacheadas.popitem(last=False)
+        return longitudes, False
+    _longitudes_cacheadas.move_to_end(clave)
+    limite = bits_codificados(freq, longitudes) * (1 + TOLERANCIA_CACHE)
+    if bits_codificados(freq, candidatas) <= limite:
+        return candidatas, True
+    return longitudes, False
+
+
+# -------------------------------------------------------------
+# Etapa LZ77 (estilo Deflate) antes de Huffman: las repeticiones se
+# reemplazan por pares (largo, distancia) hacia datos anteriores.
+# Alfabeto 1: 0-255 literales, 256 + codigo de largo
+# Alfabeto 2: codigos de distancia
+# Largos y distancias se guardan como codigo + bits extra
+# -------------------------------------------------------------
+LARGO_MIN = 3
+LARGO_MAX = 258
+MAX_BITS_LZ = 15   # Asi un par (largo, distancia) cabe en 64 bits
+VENTANA_LZ = 1 << 15
+
+# nivel: (candidatos revisados, largo suficiente, busqueda perezosa)
+NIVELES_LZ = {
+    1: (4, 8, False),
+    2: (8, 16, False),
+    3: (16, 32, False),
+    4: (16, 32, True),
+    5: (32, 64, True),
+    6: (64, 128, True),
+    7: (128, 258, True),
+    8: (512, 258, True),
+    9: (4096, 258, True),
+}
+
+def _codigo_log(v):
+    # v -> (codigo, cantidad de bits extra, valor de los bits extra)
+    if v < 4:
+        return v, 0, 0
+    e = v.bit_length() - 1
+    return 2 * e + ((v >> (e - 1)) & 1), e - 1, v & ((1 << (e - 1)) - 1)
+
+
+def _base_log(codigo):
+    # codigo -> (valor base, cantidad de bits extra)
+    if codigo < 4:
+        return codigo, 0
+    e = codigo >> 1
+    return (2 | (codigo & 1)) << (e - 1), e - 1
+
+
+def _largo_comun(datos, i, j, maximo):
+    # Largo del prefijo comun de datos[i:] y datos[j:], comparando de a 16
+    largo = 0
+    while largo + 16 <= maximo and datos[i + largo:i + largo + 16] == datos[j + largo:j + largo + 16]:
+        largo += 16
+    while largo < maximo and datos[i + largo] == datos[j + largo]:
+        largo += 1
+    return largo
+
+
+# -------------------------------------------------------------
+# Buscador de coincidencias con cadenas hash: cabeza[h] es la ultima
+# posicion con esos 3 bytes y previo[i] la anterior con el mismo hash
+# -------------------------------------------------------------
+def buscar_coincidencias(datos, nivel=6, ventana=VENTANA_LZ):
+    max_cadena, largo_bueno, perezosa = NIVELES_LZ[nivel]
+    n = len(datos)
+    cabeza = {}
+    previo = [-1] * n
+    tokens = []   # enteros (literal) o tuplas (largo, distancia)
+
+    def mejor(i):
+        # Mejor coincidencia para la posicion i (y la inserta en la cadena)
+        if i + LARGO_MIN > n:
+            return 0, 0
+        h = datos[i] << 16 | datos[i + 1] << 8 | datos[i + 2]
+        j = cabeza.get(h, -1)
+        previo[i] = j
+        cabeza[h] = i
+        maximo = min(LARGO_MAX, n - i)
+        mejor_largo, mejor_dist = 0, 0
+        revisados = 0
+        while j >= 0 and i - j <= ventana and revisados < max_cadena:
+            # Descartar rapido si no puede superar a la mejor actual
+            if datos[j + mejor_largo] == datos[i + mejor_largo]:
+                largo = _largo_comun(datos, i, j, maximo)
+                if largo > mejor_largo:
+                    mejor_largo, mejor_dist = largo, i - j
+                    if largo >= largo_bueno or largo == maximo:
+                        break
+            j = previo[j]
+            revisados += 1
+        if mejor_largo < LARGO_MIN:
+            return 0, 0
+        return mejor_largo, mejor_dist
+
+    def insertar(i):
+        if i + LARGO_MIN <= n:
+            h = datos[i] << 16 | datos[i + 1] << 8 | datos[i + 2]
+            previo[i] = cabeza.get(h, -1)
+            cabeza[h] = i
+
+    i = 0
+    pendiente = None
+    while i < n:
+        largo, dist = pendiente if pendiente else mejor(i)
+        pendiente = None
+        if largo and perezosa and largo < largo_bueno and i + 1 < n:
+            # Busqueda perezosa: si en i+1 hay algo mejor, emitir literal
+            siguiente = mejor(i + 1)
+            if siguiente[0] > largo:
+                tokens.append(datos[i])
+                i += 1
+                pendiente = siguiente
+                continue
+            inicio_insercion = i + 2
+        else:
+            inicio_insercion = i + 1
+        if not largo:
+            tokens.append(datos[i])
+            i += 1
+            continue
+        tokens.append((largo, dist))
+        # Agregar a las cadenas las posiciones cubiertas por la coincidencia
+        for k in range(inicio_insercion, i + largo):
+            insertar(k)
+        i += largo
+    return tokens
+
+
+def comprimir_lz(datos, nivel=6, ventana=VENTANA_LZ):
+    # Devuelve (longitudes literal/largo, longitudes distancia, bytes, padding)
+    tokens = buscar_coincidencias(bytes(datos), nivel, ventana)
+
+    # Frecuencias de los dos alfabetos
+    freq_ll = Counter()
+    freq_d = Counter()
+    for t in tokens:
+        if type(t) is int:
+            freq_ll[t] += 1
+        else:
+            freq_ll[256 + _codigo_log(t[0] - LARGO_MIN)[0]] += 1
+            freq_d[_codigo_log(t[1] - 1)[0]] += 1
+    long_ll = longitudes_codigo(freq_ll)
+    if max(long_ll.values(), default=0) > MAX_BITS_LZ:
+        long_ll = longitudes_limitadas(freq_ll, MAX_BITS_LZ)
+    long_d = longitudes_codigo(freq_d)
+    if max(long_d.values(), default=0) > MAX_BITS_LZ:
+        long_d = longitudes_limitadas(freq_d, MAX_BITS_LZ)
+    cod_ll = codigos_canonicos(long_ll)
+    cod_d = codigos_canonicos(long_d)
+
+    # Escribir codigos y bits extra con el acumulador entero
+    out = bytearray()
+    acc = 0
+    nacc = 0
+    for t in tokens:
+        if type(t) is int:
+            code, l = cod_ll[t]
+            acc = (acc << l) | code
+            nacc += l
+        else:
+            c, ne, extra = _codigo_log(t[0] - LARGO_MIN)
+            code, l = cod_ll[256 + c]
+            acc = (((acc << l) | code) << ne) | extra
+            nacc += l + ne
+            c, ne, extra = _codigo_log(t[1] - 1)
+            code, l = cod_d[c]
+            acc = (((acc << l) | code) << ne) | extra
+            nacc += l + ne
+        if nacc >= 32:
+            resto = nacc & 7
+            out += (acc >> resto).to_bytes(nacc >> 3, 'big')
+            acc &= (1 << resto) - 1
+            nacc = resto
+    resto = nacc & 7
+    out += (acc >> resto).to_bytes(nacc >> 3, 'big')
+    if resto:
+        out.append((acc & ((1 << resto) - 1)) << (8 - resto))
+    return long_ll, long_d, bytes(out), 8 - resto
+
+
+def _leer_simbolo_lz(tabla, acc, nacc):
+    # Un simbolo con la tabla de decodificacion -> (simbolo, bits restantes)
+    ancho, entradas = tabla[0], tabla[1]
+    while True:
+        sym, l = entradas[(acc >> (nacc - ancho)) & ((1 << ancho) - 1)]
+        if l:
+            return sym, nacc - l
+        nacc -= ancho
+        ancho, entradas = sym
+
+
+def descomprimir_lz(n_bytes, codigos_ll, codigos_d, data, clave=None):
+    tabla_ll = tabla_decodificacion(codigos_ll, unir=None, clave=clave and (clave, 0))
+    tabla_d = tabla_decodificacion(codigos_d, unir=None, clave=clave and (clave, 1))
+    out = bytearray()
+    acc = 0
+    nacc = 0
+    pos = 0
+    total = len(data)
+    while len(out) < n_bytes:
+        # Recargar: un literal o un par completo caben en 64 bits
+        while nacc < 64:
+            if pos < total:
+                chunk = data[pos:pos + 7]
+                pos += len(chunk)
+                acc = (acc << (8 * len(chunk))) | int.from_bytes(chunk, 'big')
+                nacc += 8 * len(chunk)
+            else:
+                acc <<= 56
+                nacc += 56
+
+        sym, nacc = _leer_simbolo_lz(tabla_ll, acc, nacc)
+        if sym < 256:
+            out.append(sym)
+        else:
+            base, ne = _base_log(sym - 256)
+            nacc -= ne
+            largo = LARGO_MIN + base + ((acc >> nacc) & ((1 << ne) - 1))
+            c, nacc = _leer_simbolo_lz(tabla_d, acc, nacc)
+            base, ne = _base_log(c)
+            nacc -= ne
+            dist = 1 + base + ((acc >> nacc) & ((1 << ne) - 1))
+            inicio = len(out) - dist
+            if dist >= largo:
+                out += out[inicio:inicio + largo]
+            else:
+                # Copia solapada: el patron de "dist" bytes se repite
+                out += (out[inicio:] * (largo // dist + 1))[:largo]
+        acc &= (1 << nacc) - 1
+    return bytes(out)
+
+
+# -------------------------------------------------------------
+# Formato .bin versionado:
+#   MAGIC (4 bytes) + VERSION (1 byte) + MODO (1 byte)
+#   extension del archivo original (varint + utf-8, solo modo bytes)
+#   bloques independientes, cada uno con:
+#     cantidad de simbolos (varint, 0 = fin del archivo)
+#     tamano del cuerpo en bytes (varint)
+#     cuerpo: tabla(s) de longitudes canonicas + datos comprimidos
+# Desde la version 4 cada tabla empieza con un byte de tipo: incluida
+# en el archivo o referencia (8 bytes) a una tabla compartida.
+# Las versiones 1 (un solo bloque), 2 (sin modo) y 3 (sin tipo de
+# tabla), y los .bin antiguos (pickle de la tupla freq, padding, datos)
+# se siguen pudiendo leer
+# -------------------------------------------------------------
+MAGIC = b"HUFC"
+VERSION = 4
+TAM_BLOQUE = 1 << 20   # Simbolos por bloque (limita la memoria usada)
+
+MODO_TEXTO = 0        # Caracteres Unicode leidos como UTF-8
+MODO_BYTES = 1        # Bytes crudos (0-255) de cualquier tipo de archivo
+MODO_ADAPTATIVO = 2   # Bytes en una sola pasada (ver comprimir_flujo)
+MODO_LZ = 3           # Bytes con etapa LZ77 antes de Huffman
+MODO_PALABRAS = 4     # Texto UTF-8 codificado por palabras (tokens)
+MODOS = {"texto": MODO_TEXTO, "bytes": MODO_BYTES, "lz": MODO_LZ,
+         "palabras": MODO_PALABRAS}
+
+# Indice para acceso aleatorio, escrito despues del bloque final:
+#   entradas de tamano fijo (simbolo global, posicion del bloque en el
+#   archivo, bit dentro de los datos del bloque, simbolo dentro del bloque)
+#   posicion del indice (8 bytes) + MAGIC_INDICE
+CADA_MARCA = 1 << 16   # Simbolos entre dos puntos de control
+MAGIC_INDICE = b"HIDX"
+ENTRADA_INDICE = struct.Struct('<QQQQ')
+
+def _marcas_bits(datos, longitudes, cada):
+    # Posicion en bits (dentro del bloque) de cada simbolo multiplo de
+    # "cada": la suma de las longitudes de los simbolos anteriores
+    marcas = []
+    bits = 0
+    if not isinstance(datos, str):
+        # Modo bytes: las cuentas de cada tramo con NumPy
+        simbolos = np.frombuffer(datos, dtype=np.uint8)
+        largo = np.zeros(256, dtype=np.int64)
+        for sym, l in longitudes.items():
+            largo[sym] = l
+        for i in range(0, len(simbolos), cada):
+            marcas.append((i, bits))
+            bits += int(np.bincount(simbolos[i:i + cada], minlength=256) @ largo)
+        return marcas
+    for i in range(0, len(datos), cada):
+        marcas.append((i, bits))
+        bits += sum(longitudes[sym] * n for sym, n in Counter(datos[i:i + cada]).items())
+    return marcas
+
+
+# -------------------------------------------------------------
+# Tablas compartidas (pre-entrenadas): los archivos guardan solo el
+# identificador de la tabla en lugar de la tabla completa
 # -------------------------------------------------------------
-def comprimir_archivo(input_path, out_dir):
-    # Leer el contenido del archivo de texto
-    with open(input_path, 'r', encoding='utf-8', errors="ignore") as f:
-        text = f.read()
+TABLA_INCLUIDA = 0
+TABLA_COMPARTIDA = 1
+MAGIC_TABLA = b"HUFT"
+TABLAS_COMPARTIDAS = {}   # identificador -> (modo, longitudes)
 
-    # Comprimir el texto
-    freq, data_bytes, padding = comprimir_texto(text)
+def registrar_tabla(longitudes, modo="texto"):
+    # El identificador es un hash del contenido de la tabla
+    contenido = bytes([MODOS[modo]]) + serializar_longitudes(longitudes)
+    tabla_id = hashlib.sha256(contenido).digest()[:8]
+    TABLAS_COMPARTIDAS[tabla_id] = (MODOS[modo], longitudes)
+    return tabla_id
+
+
+def entrenar_tabla(rutas, modo="texto", max_bits=None):
+    # Frecuencias de todos los archivos de muestra
+    freq = Counter()
+    for ruta in rutas:
+        if modo == "texto":
+            lector = _leer_textos(ruta, TAM_BLOQUE)
+        else:
+            lector = _leer_bytes(ruta, TAM_BLOQUE, False)
+        for datos in lector:
+            freq.update(datos)
+    # En modo bytes la tabla cubre los 256 valores
+    if modo == "bytes":
+        for sym in range(256):
+            freq[sym] += 1
+    return registrar_tabla(calcular_longitudes(freq, max_bits), modo)
+
+
+def guardar_tabla(tabla_id, path):
+    modo, longitudes = TABLAS_COMPARTIDAS[tabla_id]
+    with open(path, 'wb') as f:
+        f.write(MAGIC_TABLA + bytes([modo]) + serializar_longitudes(longitudes))
+
+
+def cargar_tabla(path):
+    with open(path, 'rb') as f:
+        contenido = f.read()
+    if contenido[:4] != MAGIC_TABLA:
+        raise ValueError("No es un archivo de tabla Huffman")
+    modo = contenido[4]
+    longitudes, _ = leer_longitudes(contenido, 5, modo == MODO_TEXTO)
+    nombre = {v: k for k, v in MODOS.items()}[modo]
+    return registrar_tabla(longitudes, nombre)
+
+
+def serializar_tabla(longitudes=None, tabla_id=None):
+    if tabla_id is not None:
+        return bytes([TABLA_COMPARTIDA]) + tabla_id
+    return bytes([TABLA_INCLUIDA]) + serializar_longitudes(longitudes)
+
+
+def leer_tabla(buf, pos, texto=True):
+    tipo = buf[pos]
+    pos += 1
+    if tipo == TABLA_COMPARTIDA:
+        tabla_id = bytes(buf[pos:pos + 8])
+        if tabla_id not in TABLAS_COMPARTIDAS:
+            raise ValueError(f"Tabla compartida no registrada: {tabla_id.hex()}")
+        return TABLAS_COMPARTIDAS[tabla_id][1], pos + 8
+    return leer_longitudes(buf, pos, texto)
+
+
+def _comprimir_bloque_lz(datos, nivel, ventana):
+    long_ll, long_d, data_bytes, padding = comprimir_lz(datos, nivel, ventana)
+    cuerpo = serializar_tabla(long_ll) + serializar_tabla(long_d) + data_bytes
+    bloque = _varint(len(datos)) + _varint(len(cuerpo)) + cuerpo
+    bits = len(data_bytes) * 8 - padding % 8
+    # Un bloque LZ solo se puede decodificar desde su inicio
+    info = {
+        "simbolos": len(datos),
+        "longitudes": long_ll,
+        "bytes_datos": len(data_bytes),
+        "padding": padding % 8,
+        "bits": bits,
+        "bits_sin_limite": bits,
+        "marcas": [(0, 0)],
+    }
+    return bloque, info
+
+
+# -------------------------------------------------------------
+# Modo palabras: el texto se divide en tokens (palabras, espacios y
+# signos sueltos) y cada token es un simbolo de Huffman. Los tokens
+# raros no entran en el vocabulario: se escriben caracter por caracter
+# (cada caracter es tambien un token), asi el vocabulario de un bloque
+# solo guarda lo que se repite. El decodificador solo concatena tokens
+# -------------------------------------------------------------
+TOKEN = re.compile(r"\w+|\s+|[^\w\s]")
+MIN_REPETICIONES = 2   # Veces que debe aparecer un token para entrar al vocabulario
+
+def tokenizar(txt):
+    return TOKEN.findall(txt)
+
+
+def serializar_vocabulario(longitudes):
+    # Tokens ordenados con codificacion por prefijo: caracteres
+    # compartidos con el token anterior (varint), resto en UTF-8
+    # (largo varint + bytes) y longitud de codigo (1 byte)
+    out = bytearray(_varint(len(longitudes)))
+    prev = ""
+    for token in sorted(longitudes):
+        comun = 0
+        maximo = min(len(prev), len(token))
+        while comun < maximo and prev[comun] == token[comun]:
+            comun += 1
+        resto = token[comun:].encode('utf-8')
+        out += _varint(comun) + _varint(len(resto)) + resto
+        out.append(longitudes[token])
+        prev = token
+    return bytes(out)
+
+
+def leer_vocabulario(buf, pos):
+    n, pos = _leer_varint(buf, pos)
+    longitudes = {}
+    prev = ""
+    for _ in range(n):
+        comun, pos = _leer_varint(buf, pos)
+        largo, pos = _leer_varint(buf, pos)
+        prev = prev[:comun] + bytes(buf[pos:pos + largo]).decode('utf-8')
+        pos += largo
+        longitudes[prev] = buf[pos]
+        pos += 1
+    return longitudes, pos
+
+
+def _comprimir_bloque_palabras(tokens, max_bits=None):
+    # Los tokens poco frecuentes se separan en caracteres (escape)
+    cuenta = Counter(tokens)
+    simbolos = []
+    for token in tokens:
+        if cuenta[token] >= MIN_REPETICIONES or len(token) == 1:
+            simbolos.append(token)
+        else:
+            simbolos.extend(token)
+    freq = Counter(simbolos)
+    longitudes = calcular_longitudes(freq, max_bits)
+    data_bytes, padding = empaquetar_bits(simbolos, codigos_canonicos(longitudes))
+    cuerpo = serializar_vocabulario(longitudes) + data_bytes
+    bloque = _varint(len(simbolos)) + _varint(len(cuerpo)) + cuerpo
+
+    bits = bits_codificados(freq, longitudes)
+    info = {
+        "simbolos": len(simbolos),
+        "caracteres": sum(map(len, tokens)),
+        "longitudes": longitudes,
+        "bytes_datos": len(data_bytes),
+        "padding": padding % 8,
+        "bits": bits,
+        "bits_sin_limite": bits_codificados(freq, longitudes_codigo(freq)) if max_bits else bits,
+        # Sin puntos de control: el indice cuenta caracteres, no tokens
+        "marcas": [],
+    }
+    return bloque, info
+
+
+def comprimir_bloque(datos, max_bits=None, lz=None, cache=False, compartida=None):
+    # datos: str (modo texto) o bytes/memoryview (modo bytes)
+    # lz: (nivel, ventana) para aplicar la etapa LZ77
+    # cache: reutilizar longitudes por huella de frecuencias (solo si
+    # cuestan a lo sumo TOLERANCIA_CACHE mas que las exactas)
+    # compartida: (identificador, longitudes) de una tabla compartida
+    if lz:
+        return _comprimir_bloque_lz(datos, *lz)
+    if isinstance(datos, str):
+        freq = Counter(datos)
+    else:
+        # Modo bytes: se cuenta y se empaqueta con NumPy, con codigos de
+        # hasta MAX_BITS_BYTES bits para poder decodificar con NumPy
+        simbolos = np.frombuffer(datos, dtype=np.uint8)
+        cuentas = np.bincount(simbolos, minlength=256)
+        freq = {sym: n for sym, n in enumerate(cuentas.tolist()) if n}
+        max_bits = min(max_bits or MAX_BITS_BYTES, MAX_BITS_BYTES)
+    cacheada = False
+    if compartida is not None and all(sym in compartida[1] for sym in freq):
+        longitudes = compartida[1]
+        tabla = serializar_tabla(tabla_id=compartida[0])
+    else:
+        # Si la tabla compartida no cubre todos los simbolos se incluye una
+        if cache:
+            longitudes, cacheada = longitudes_cacheadas(freq, max_bits)
+        else:
+            longitudes = calcular_longitudes(freq, max_bits)
+        tabla = serializar_tabla(longitudes)
+    if isinstance(datos, str) or max(longitudes.values(), default=0) > MAX_BITS_BYTES:
+        # Texto, o una tabla compartida con codigos mas largos
+        data_bytes, padding = empaquetar_bits(datos, codigos_canonicos(longitudes))
+    else:
+        data_bytes, padding = _empaquetar_bytes(simbolos, codigos_canonicos(longitudes))
+    cuerpo = tabla + data_bytes
+    bloque = _varint(len(datos)) + _varint(len(cuerpo)) + cuerpo
+
+    # Datos del bloque para las estadisticas
+    info = {
+        "simbolos": len(datos),
+        "longitudes": longitudes,
+        "bytes_datos": len(data_bytes),
+        "padding": padding % 8,
+        "bits": bits_codificados(freq, longitudes),
+        "marcas": _marcas_bits(datos, longitudes, CADA_MARCA),
+        "cacheada": cacheada,
+    }
+    if max_bits:
+        info["bits_sin_limite"] = bits_codificados(freq, longitudes_codigo(freq))
+    else:
+        info["bits_sin_limite"] = info["bits"]
+    return bloque, info
+
+
+def _leer_varint_archivo(f):
+    n = 0
+    shift = 0
+    while True:
+        byte = f.read(1)
+        if not byte:
+            raise ValueError("Archivo .bin truncado")
+        n |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            return n
+        shift += 7
+
+
+def _leer_cuerpo(cuerpo, n_simbolos, modo, version=VERSION, cache=False):
+    # Devuelve tambien la clave de la tabla para la cache de tablas de
+    # decodificacion: las tablas compartidas siempre se cachean (su
+    # clave es el identificador), las incluidas solo con cache=True
+    if modo == MODO_PALABRAS:
+        longitudes, pos = leer_vocabulario(cuerpo, 0)
+        clave = bytes(cuerpo[:pos]) if cache else None
+        return n_simbolos, codigos_canonicos(longitudes), cuerpo[pos:], modo, clave
+    leer = leer_tabla if version >= 4 else leer_longitudes
+    longitudes, pos = leer(cuerpo, 0, modo == MODO_TEXTO)
+    codigos = codigos_canonicos(longitudes)
+    if modo == MODO_LZ:
+        # Segunda tabla: codigos de distancia
+        longitudes, pos = leer(cuerpo, pos, False)
+        codigos = (codigos, codigos_canonicos(longitudes))
+    compartida = version >= 4 and cuerpo[0] == TABLA_COMPARTIDA
+    clave = bytes(cuerpo[:pos]) if cache or compartida else None
+    return n_simbolos, codigos, cuerpo[pos:], modo, clave
+
+
+def _descomprimir_bloque(n_simbolos, codigos, data_bytes, modo=MODO_TEXTO, clave=None):
+    if modo == MODO_LZ:
+        return descomprimir_lz(n_simbolos, codigos[0], codigos[1], data_bytes, clave)
+    if modo == MODO_BYTES:
+        if max(l for _, l in codigos.values()) <= MAX_BITS_BYTES:
+            return _decodificar_bytes_np(data_bytes, n_simbolos, codigos)
+        # Codigos mas largos (tablas compartidas o bloques antiguos): cada
+        # simbolo como un fragmento de 1 byte para unir con b''.join
+        codigos = {bytes((sym,)): c for sym, c in codigos.items()}
+        tabla = tabla_decodificacion(codigos, unir=b''.join, clave=clave)
+        return b''.join(decodificar_bytes(data_bytes, n_simbolos, tabla))
+    # Tabla de decodificacion (varios bits por consulta), desde la cache
+    tabla = tabla_decodificacion(codigos, clave=clave)
+    return ''.join(decodificar_bytes(data_bytes, n_simbolos, tabla))
+
+
+# -------------------------------------------------------------
+# Leer la cabecera de un .bin abierto. Devuelve el modo, la extension
+# original y un generador con los bloques: (cantidad de simbolos,
+# codigos, bytes comprimidos, modo) y la version. En modo adaptativo
+# el generador entrega directamente los bytes ya decodificados
+# -------------------------------------------------------------
+def _abrir_bin(f, cache=False):
+    inicio = f.read(5)
+    # Formato antiguo: pickle con el Counter completo de frecuencias
+    if inicio[:4] != MAGIC:
+        datos = pickle.loads(inicio + f.read())
+        if len(datos) == 2:
+            # Version mas antigua: (freq, bitstring) sin empaquetar
+            freq, bitstring = datos
+            data_bytes, _ = bitstring_a_bytes(bitstring)
+        else:
+            freq, padding, data_bytes = datos
+        codigos = codigos_enteros(construir_codigo(construir_arbol(freq)))
+        return MODO_TEXTO, ".txt", iter([(sum(freq.values()), codigos, data_bytes, MODO_TEXTO)]), 0
+
+    version = inicio[4]
+    if version == 1:
+        # Un unico bloque que ocupa el resto del archivo
+        n_simbolos = _leer_varint_archivo(f)
+        return MODO_TEXTO, ".txt", iter([_leer_cuerpo(f.read(), n_simbolos, MODO_TEXTO, 1)]), 1
+    if version == 2:
+        return MODO_TEXTO, ".txt", _iterar_bloques(f, MODO_TEXTO, 2, cache), 2
+    if version in (3, VERSION):
+        modo = f.read(1)[0]
+        ext = f.read(_leer_varint_archivo(f)).decode('utf-8')
+        if modo == MODO_ADAPTATIVO:
+            return modo, ext or ".txt", _iterar_flujo(f), version
+        if modo not in MODOS.values():
+            raise ValueError(f"Modo de archivo .bin desconocido: {modo}")
+        return modo, ext or ".txt", _iterar_bloques(f, modo, version, cache), version
+    raise ValueError(f"Version de archivo .bin no soportada: {version}")
+
+
+def _iterar_bloques(f, modo, version, cache=False):
+    while True:
+        n_simbolos = _leer_varint_archivo(f)
+        if n_simbolos == 0:
+            return
+        tam = _leer_varint_archivo(f)
+        cuerpo = f.read(tam)
+        if len(cuerpo) < tam:
+            raise ValueError("Archivo .bin truncado")
+        yield _leer_cuerpo(cuerpo, n_simbolos, modo, version, cache)
+
+
+def _leer_textos(path, tam_bloque):
+    with open(path, 'r', encoding='utf-8', errors="ignore") as entrada:
+        while True:
+            txt = entrada.read(tam_bloque)
+            if not txt:
+                return
+            yield txt
+
+
+def _leer_bytes(path, tam_bloque, copiar):
+    if not os.path.getsize(path):
+        return
+    datos = _mapear(path)
+    # Rebanadas del memoryview: no se copia el archivo, salvo que
+    # haya que enviar los bloques a otros procesos
+    for i in range(0, len(datos), tam_bloque):
+        bloque = datos[i:i + tam_bloque]
+        yield bytes(bloque) if copiar else bloque
+
+
+def _leer_tokens(path, tam_bloque):
+    # El ultimo token de cada bloque puede seguir en el bloque siguiente:
+    # se guarda y se une con el texto que sigue (salvo que ya sea enorme)
+    resto = ""
+    for txt in _leer_textos(path, tam_bloque):
+        tokens = tokenizar(resto + txt)
+        resto = tokens.pop()
+        if len(resto) >= tam_bloque:
+            tokens.append(resto)
+            resto = ""
+        if tokens:
+            yield tokens
+    if resto:
+        yield [resto]
+
+
+# -------------------------------------------------------------
+# Funcion para comprimir un archivo a binario (.bin).
+# Se lee y se escribe por bloques, sin cargar todo el archivo.
+# modo="texto" cuenta caracteres UTF-8; modo="bytes" trabaja sobre
+# los bytes crudos del archivo (mmap, sin decodificar) y sirve para
+# cualquier tipo de archivo; modo="lz" agrega sobre los bytes una etapa
+# LZ77 (nivel 1 = rapido ... 9 = mejor compresion, ventana en bytes);
+# modo="palabras" codifica el texto por palabras en lugar de caracteres.
+# Con procesos > 1 (o None = todos los nucleos) los bloques se
+# comprimen en paralelo. max_bits limita la longitud de los codigos.
+# cache_tablas reutiliza tablas de distribuciones parecidas y tabla
+# (identificador de registrar_tabla/entrenar_tabla/cargar_tabla) usa
+# una tabla compartida en lugar de guardarla en el archivo
+# -------------------------------------------------------------
+def comprimir_archivo(input_path, out_dir, stats=None, tam_bloque=TAM_BLOQUE, procesos=1,
+                      modo="texto", max_bits=None, nivel=6, ventana=VENTANA_LZ,
+                      cache_tablas=False, tabla=None):
+    if modo not in MODOS:
+        raise ValueError(f"Modo desconocido: {modo}")
+    compartida = None
+    if tabla is not None:
+        if tabla not in TABLAS_COMPARTIDAS:
+            raise ValueError(f"Tabla compartida no registrada: {tabla.hex()}")
+        modo_tabla, longitudes = TABLAS_COMPARTIDAS[tabla]
+        if modo in ("lz", "palabras") or modo_tabla != MODOS[modo]:
+            raise ValueError(f"La tabla compartida no sirve para el modo {modo}")
+        compartida = (tabla, longitudes)
 
     # Crear el nombre del archivo comprimido (.bin)
-    basename = os.path.splitext(os.path.basename(input_path))[0]
+    basename, ext = os.path.splitext(os.path.basename(input_path))
     out_path = os.path.join(out_dir, basename + ".bin")
 
-    # Guardar las frecuencias, padding y datos comprimidos usando pickle
-    with open(out_path, 'wb') as f:
-        pickle.dump((freq, padding, data_bytes), f)
+    caracteres = 0
+    unicos = set()
+    bytes_datos = 0
+    padding = 0
+    bits_sin_limite = 0
+    cacheados = 0
+
+    if modo == "texto":
+        bloques = _leer_textos(input_path, tam_bloque)
+        ext = ""
+    elif modo == "palabras":
+        bloques = _leer_tokens(input_path, tam_bloque)
+        ext = ""
+    else:
+        bloques = _leer_bytes(input_path, tam_bloque, procesos != 1)
+    lz = (nivel, ventana) if modo == "lz" else None
+    if modo == "palabras":
+        funcion = _comprimir_bloque_palabras
+        tareas = ((tokens, max_bits) for tokens in bloques)
+    else:
+        funcion = comprimir_bloque
+        tareas = ((datos, max_bits, lz, cache_tablas, compartida) for datos in bloques)
+
+    with open(out_path, 'wb') as salida:
+        ext = ext.encode('utf-8')
+        salida.write(MAGIC + bytes([VERSION, MODOS[modo]]) + _varint(len(ext)) + ext)
+        # Comprimir y escribir cada bloque en orden
+        indice = []
+        for bloque, info in _mapa_ordenado(funcion, tareas, procesos):
+            # Puntos de control del bloque para el acceso aleatorio
+            pos_bloque = salida.tell()
+            for i, bits in info["marcas"]:
+                indice.append((caracteres + i, pos_bloque, bits, i))
+            salida.write(bloque)
+            caracteres += info.get("caracteres", info["simbolos"])
+            unicos.update(info["longitudes"])
+            bytes_datos += info["bytes_datos"]
+            padding += info["padding"]
+            bits_sin_limite += info["bits_sin_limite"]
+            cacheados += info.get("cacheada", False)
+        # Bloque vacio que marca el final del archivo
+        salida.write(_varint(0))
+
+        # Indice de puntos de control al final del archivo (con un solo
+        # punto no sirve: se decodifica desde el inicio igual)
+        if len(indice) > 1:
+            pos_indice = salida.tell()
+            for entrada in indice:
+                salida.write(ENTRADA_INDICE.pack(*entrada))
+            salida.write(struct.pack('<Q', pos_indice) + MAGIC_INDICE)
+
+    # Estadisticas opcionales para mostrar en la interfaz
+    if stats is not None:
+        stats["caracteres"] = caracteres
+        stats["unicos"] = len(unicos)
+        stats["bits"] = bytes_datos * 8 - padding
+        stats["padding"] = padding
+        stats["bytes_datos"] = bytes_datos
+        stats["bytes_cabecera"] = os.path.getsize(out_path) - bytes_datos
+        # Costo en tamano de limitar la longitud de los codigos
+        bits = bytes_datos * 8 - padding
+        stats["bits_sin_limite"] = bits_sin_limite
+        stats["costo_limite"] = (bits / bits_sin_limite - 1) * 100 if bits_sin_limite else 0.0
+        # Bloques que usaron longitudes de la cache (cache_tablas)
+        stats["bloques_cacheados"] = cacheados
 
     # Devolver la ruta del archivo comprimido
     return out_path
 
 
+def _bloques_decodificados(modo, bloques, procesos):
+    # Los bloques adaptativos dependen de los anteriores: van en orden
+    if modo == MODO_ADAPTATIVO:
+        return bloques
+    return _mapa_ordenado(_descomprimir_bloque, bloques, procesos)
+
+
 # -------------------------------------------------------------
-# Funcion para descomprimir un archivo comprimido (.bin)
+# Funcion para descomprimir un archivo comprimido (.bin).
+# Cada bloque se decodifica y se escribe antes de leer el siguiente;
+# con procesos > 1 (o None) los bloques se decodifican en paralelo.
+# cache_tablas guarda las tablas de decodificacion para los siguientes
+# bloques y archivos con la misma tabla (p. ej. los comprimidos con
+# cache_tablas); las tablas compartidas se guardan siempre
 # -------------------------------------------------------------
-def descomprimir_archivo(bin_path, out_dir):
-    # Cargar las frecuencias, padding y bytes desde el archivo
-    with open(bin_path, 'rb') as f:
-        freq, padding, data_bytes = pickle.load(f)
+def descomprimir_archivo(bin_path, out_dir, stats=None, procesos=1, cache_tablas=False):
+    tam = 0
+    inicio = time.perf_counter()
+    with open(bin_path, 'rb') as entrada:
+        modo, ext, bloques, _ = _abrir_bin(entrada, cache_tablas)
 
-    # Convertir bytes nuevamente a bitstring
-    bitstring = bytes_a_bitstring(data_bytes, padding)
+        # Crear el nombre del archivo descomprimido
+        basename = os.path.splitext(os.path.basename(bin_path))[0]
+        out_path = os.path.join(out_dir, basename + "_descomprimido" + ext)
 
-    # Reconstruir el arbol de Huffman a partir de las frecuencias
-    tree = construir_arbol(freq)
-    # Generar nuevamente la tabla de codigos
-    codes = construir_codigo(tree)
-    # Crear el diccionario inverso (codigo -> caracter)
-    rev = {v: k for k, v in codes.items()}
+        texto = modo in (MODO_TEXTO, MODO_PALABRAS)
+        if texto:
+            salida = open(out_path, 'w', encoding='utf-8')
+        else:
+            salida = open(out_path, 'wb')
 
-    # Decodificar el texto bit a bit
-    decoded_chars = []
-    buffer = ""
-    for bit in bitstring:
-        buffer += bit
-        if buffer in rev:
-            decoded_chars.append(rev[buffer])
-            buffer = ""
+        # Decodificar los bloques (en paralelo si procesos > 1) y
+        # escribirlos en el mismo orden en que estan en el archivo
+        with salida:
+            for datos in _bloques_decodificados(modo, bloques, procesos):
+                salida.write(datos)
+                tam += len(datos.encode('utf-8')) if texto else len(datos)
+    segundos = time.perf_counter() - inicio
 
-    # Unir los caracteres decodificados en una cadena
-    text = ''.join(decoded_chars)
+    # Estadisticas opcionales: velocidad de decodificacion en MB/s
+    if stats is not None:
+        stats["bytes"] = tam
+        stats["segundos"] = segundos
+        stats["mb_s"] = tam / 1e6 / segundos if segundos > 0 else 0.0
 
-    # Crear el nombre del archivo descomprimido
-    basename = os.path.splitext(os.path.basename(bin_path))[0]
-    out_path = os.path.join(out_dir, basename + "_descomprimido.txt")
+    # Devolver la ruta del archivo de salida
+    return out_path
 
-    # Guardar el texto descomprimido en un archivo
-    with open(out_path, 'w', encoding='utf-8') as f:
-        f.write(text)
 
-    # Devolver la ruta del archivo de salida
-    return out_path
\ No newline at end of file
+# -------------------------------------------------------------
+# Comprimir / descomprimir un buffer de bytes en memoria: un solo
+# bloque en modo bytes (comprimir_bloque), sin la cabecera del archivo
+# .bin. Sirve para que otros compresores usen Huffman como
+# codificacion de entropia
+# -------------------------------------------------------------
+def comprimir_bytes(datos, max_bits=None):
+    if not len(datos):
+        return _varint(0)
+    return comprimir_bloque(datos, max_bits)[0]
+
+
+def descomprimir_bytes(bloque):
+    n_simbolos, pos = _leer_varint(bloque, 0)
+    if n_simbolos == 0:
+        return b""
+    tam, pos = _leer_varint(bloque, pos)
+    cuerpo = bloque[pos:pos + tam]
+    if len(cuerpo) < tam:
+        raise ValueError("Bloque comprimido truncado")
+    return _descomprimir_bloque(*_leer_cuerpo(cuerpo, n_simbolos, MODO_BYTES))
+
+
+# -------------------------------------------------------------
+# Modo adaptativo de una sola pasada, para tuberias (stdin) y flujos
+# sin fin. El modelo son las frecuencias de los bytes ya procesados:
+# el codigo de cada bloque se calcula con los bloques anteriores, asi
+# que no se guarda ninguna tabla y el decodificador reconstruye el
+# mismo modelo a medida que avanza
+# -------------------------------------------------------------
+TAM_BLOQUE_FLUJO = 1 << 16   # Bytes por bloque como maximo (latencia)
+MAX_BITS_FLUJO = 12          # Codigos cortos: tabla de un solo nivel
+LIMITE_CUENTAS = 1 << 20     # Al superarlo las cuentas se reducen a la mitad
+
+def _codigos_modelo(cuentas):
+    longitudes = longitudes_limitadas(dict(enumerate(cuentas)), MAX_BITS_FLUJO)
+    return codigos_canonicos(longitudes)
+
+
+def _actualizar_modelo(cuentas, datos):
+    for sym, n in Counter(datos).items():
+        cuentas[sym] += n
+    # Reducir las cuentas para que el modelo siga a los datos recientes
+    if sum(cuentas) > LIMITE_CUENTAS:
+        for i in range(256):
+            cuentas[i] = (cuentas[i] + 1) // 2
+
+
+def _iterar_flujo(f):
+    cuentas = [1] * 256
+    while True:
+        n_simbolos = _leer_varint_archivo(f)
+        if n_simbolos == 0:
+            return
+        tam = _leer_varint_archivo(f)
+        data_bytes = f.read(tam)
+        if len(data_bytes) < tam:
+            raise ValueError("Archivo .bin truncado")
+        codigos = {bytes((sym,)): c for sym, c in _codigos_modelo(cuentas).items()}
+        tabla = tabla_decodificacion(codigos, unir=b''.join)
+        datos = b''.join(decodificar_bytes(data_bytes, n_simbolos, tabla))
+        yield datos
+        _actualizar_modelo(cuentas, datos)
+
+
+# -------------------------------------------------------------
+# Funcion para comprimir un flujo binario (por ejemplo sys.stdin.buffer)
+# en una sola pasada. Cada bloque se escribe y se vacia apenas se lee,
+# sin esperar al final de la entrada. Devuelve los bytes procesados
+# -------------------------------------------------------------
+def comprimir_flujo(entrada, salida, tam_bloque=TAM_BLOQUE_FLUJO):
+    # read1 devuelve lo que ya esta disponible sin esperar a llenar el bloque
+    leer = getattr(entrada, 'read1', entrada.read)
+    salida.write(MAGIC + bytes([VERSION, MODO_ADAPTATIVO]) + _varint(0))
+
+    cuentas = [1] * 256
+    total = 0
+    while True:
+        datos = leer(tam_bloque)
+        if not datos:
+            break
+        codigos = _codigos_modelo(cuentas)
+        data_bytes, _ = empaquetar_bits(datos, [codigos[i] for i in range(256)])
+        salida.write(_varint(len(datos)) + _varint(len(data_bytes)) + data_bytes)
+        salida.flush()
+        total += len(datos)
+        _actualizar_modelo(cuentas, datos)
+
+    # Bloque vacio que marca el final del flujo
+    salida.write(_varint(0))
+    salida.flush()
+    return total
+
+
+# -------------------------------------------------------------
+# Funcion para descomprimir un flujo binario hacia otro flujo. Acepta
+# cualquier .bin (el texto se escribe como UTF-8)
+# -------------------------------------------------------------
+def descomprimir_flujo(entrada, salida, procesos=1):
+    modo, _, bloques, _ = _abrir_bin(entrada)
+    total = 0
+    for datos in _bloques_decodificados(modo, bloques, procesos):
+        if modo in (MODO_TEXTO, MODO_PALABRAS):
+            datos = datos.encode('utf-8')
+        salida.write(datos)
+        salida.flush()
+        total += len(datos)
+    return total
+
+
+# -------------------------------------------------------------
+# Acceso aleatorio: buscar en el indice (busqueda binaria sobre el
+# archivo, sin cargarlo) el ultimo punto de control antes de "inicio"
+# -------------------------------------------------------------
+class _Indice:
+    # Lee cada entrada del indice directamente del archivo al pedirla
+    def __init__(self, f, pos_indice, fin_indice):
+        self.f = f
+        self.pos = pos_indice
+        self.n = (fin_indice - pos_indice) // ENTRADA_INDICE.size
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        self.f.seek(self.pos + i * ENTRADA_INDICE.size)
+        return ENTRADA_INDICE.unpack(self.f.read(ENTRADA_INDICE.size))
+
+
+class _ClavesIndice:
+    # Vista de solo las posiciones globales, para usar con bisect
+    def __init__(self, indice):
+        self.indice = indice
+
+    def __len__(self):
+        return len(self.indice)
+
+    def __getitem__(self, i):
+        return self.indice[i][0]
+
+
+def _leer_indice(f):
+    f.seek(0, os.SEEK_END)
+    fin = f.tell()
+    if fin < 12:
+        return None
+    f.seek(fin - 12)
+    cola = f.read(12)
+    if cola[8:] != MAGIC_INDICE:
+        return None
+    return _Indice(f, struct.unpack('<Q', cola[:8])[0], fin - 12)
+
+
+# -------------------------------------------------------------
+# Funcion para descomprimir solo "longitud" simbolos (caracteres en
+# modo texto, bytes en modo bytes) a partir de la posicion "inicio".
+# Con indice solo se decodifica desde el punto de control mas cercano;
+# los archivos sin indice se recorren desde el principio
+# -------------------------------------------------------------
+def leer_rango(bin_path, inicio, longitud):
+    fin = inicio + longitud
+    partes = []
+    with open(bin_path, 'rb') as f:
+        modo, _, bloques, version = _abrir_bin(f)
+        vacio = '' if modo in (MODO_TEXTO, MODO_PALABRAS) else b''
+        pos_bloques = f.tell()
+        indice = _leer_indice(f) if modo != MODO_ADAPTATIVO else None
+
+        if indice is None or len(indice) == 0:
+            f.seek(pos_bloques)
+            # Sin indice: decodificar bloque por bloque hasta cubrir el rango
+            actual = 0
+            for datos in _bloques_decodificados(modo, bloques, 1):
+                if actual + len(datos) > inicio:
+                    partes.append(datos[max(inicio - actual, 0):fin - actual])
+                actual += len(datos)
+                if actual >= fin:
+                    break
+            return vacio.join(partes)
+
+        # Punto de control: (simbolo global, bloque, bit, simbolo en el bloque)
+        k = bisect.bisect_right(_ClavesIndice(indice), inicio) - 1
+        actual, pos_bloque, bits, en_bloque = indice[max(k, 0)]
+        f.seek(pos_bloque)
+        while actual < fin:
+            n_bloque = _leer_varint_archivo(f)
+            if n_bloque == 0:
+                break
+            cuerpo = f.read(_leer_varint_archivo(f))
+            _, codigos, data_bytes, _, clave = _leer_cuerpo(cuerpo, n_bloque, modo, version)
+
+            # Decodificar solo lo necesario de este bloque
+            cantidad = min(n_bloque - en_bloque, fin - actual)
+            if modo == MODO_LZ:
+                # Los bloques LZ se decodifican desde su inicio
+                datos = descomprimir_lz(n_bloque, codigos[0], codigos[1], data_bytes, clave)[:cantidad]
+            elif modo == MODO_BYTES and max(l for _, l in codigos.values()) <= MAX_BITS_BYTES:
+                datos = _decodificar_bytes_np(data_bytes, cantidad, codigos, bits)
+            else:
+                if modo == MODO_BYTES:
+                    codigos = {bytes((sym,)): c for sym, c in codigos.items()}
+                    tabla = tabla_decodificacion(codigos, unir=b''.join, clave=clave)
+                else:
+                    tabla = tabla_decodificacion(codigos, clave=clave)
+                datos = vacio.join(decodificar_bytes(data_bytes, cantidad, tabla, bits))
+            partes.append(datos[max(inicio - actual, 0):])
+            actual += cantidad
+            bits = en_bloque = 0
+    return vacio.join(partes)
+
@@ -64,22 +64,19 @@ class TextoTab(QWidget):
             return
 
         # Ejecutar la compresion
-        out = text_compressor.comprimir_archivo(self.filepath, OUT_DIR)
+        stats = {}
+        out = text_compressor.comprimir_archivo(self.filepath, OUT_DIR, stats)
         orig = os.path.getsize(self.filepath)
         comp = os.path.getsize(out)
 
-        # 🔹 Leer el archivo comprimido (.bin) para obtener los datos comprimidos
-        import pickle
-        with open(out, 'rb') as f:
-            freq, padding, data_bytes = pickle.load(f)
-
         # Calcular estadísticas
-        total_bits = len(data_bytes) * 8 - padding  # bits reales sin padding
-        tamano_real_comprimido = len(data_bytes)  # tamaño en bytes del binario puro
+        total_bits = stats["bits"]  # bits reales sin padding
+        tamano_real_comprimido = stats["bytes_datos"]  # tamaño en bytes del binario puro
         porcentaje_compresion = (1 - (tamano_real_comprimido / orig)) * 100 if orig != 0 else 0
+        padding = stats["padding"]
 
         # Contar frecuencias para estadisticas
-        total_caracteres = sum(freq.values())
+        total_caracteres = stats["caracteres"]
 
         # Mostrar resultados
         self.resultado.setPlainText(
@@ -91,7 +88,7 @@ class TextoTab(QWidget):
             f"--- Estadísticas de codificación ---\n"
             f"Total de caracteres: {total_caracteres}\n"
             f"Total de bits utilizados: {total_bits}\n"
-            f"Caracteres únicos: {len(freq)}\n"
+            f"Caracteres únicos: {stats['unicos']}\n"
             f"Padding agregado: {padding} bits\n"
         )
 
@@ -99,8 +96,10 @@ class TextoTab(QWidget):
         fn, _ = QFileDialog.getOpenFileName(self, "Seleccionar .bin (Huffman)", "", "Binary files (*.bin);;All files (*)")
         if not fn:
             return
-        out = text_compressor.descomprimir_archivo(fn, OUT_DIR)
-        QMessageBox.information(self, "Hecho", f"Archivo descomprimido: {out}")
+        stats = {}
+        out = text_compressor.descomprimir_archivo(fn, OUT_DIR, stats)
+        QMessageBox.information(self, "Hecho", f"Archivo descomprimido: {out}\n"
+                                f"Velocidad de decodificacion: {stats['mb_s']:.2f} MB/s")
 
 # IMAGEN
 class ImagenTab(QWidget):
@@ -173,25 +172,14 @@ class ImagenTab(QWidget):
 
         try:
             # Ejecutar compresión
-            out = image_compressor.comprimir_imagen(self.filepath, OUT_DIR)
+            stats = {}
+            out = image_compressor.comprimir_imagen(self.filepath, OUT_DIR, stats)
             orig = os.path.getsize(self.filepath)
             comp = os.path.getsize(out)
 
-            # Leer el archivo binario RLE para extraer estadísticas
-            with open(out, "rb") as f:
-                # Leer header (12 bytes)
-                w = int.from_bytes(f.read(4), 'big')
-                h = int.from_bytes(f.read(4), 'big')
-                num_runs = int.from_bytes(f.read(4), 'big')
-                
-                # Leer corridas y extraer colores únicos
-                unique_colors = set()
-                for _ in range(num_runs):
-                    data = f.read(4)  # R, G, B, count
-                    if len(data) < 4:
-                        break
-                    r, g, b, count = data[0], data[1], data[2], data[3]
-                    unique_colors.add((r, g, b))
+            # Estadísticas calculadas por el compresor (sin volver a leer el .rle)
+            w, h = stats["ancho"], stats["alto"]
+            num_runs = stats["corridas"]
 
             # Estadísticas RLE
             total_pixels = w * h
@@ -200,8 +188,8 @@ class ImagenTab(QWidget):
             porcentaje_compresion = (1 - (comp / orig)) * 100 if orig != 0 else 0
 
             # Calcular overhead y datos reales
-            header_size = 12  # bytes
-            data_size = runs * 4  # bytes (cada corrida = 4 bytes)
+            header_size = stats["bytes_cabecera"]
+            data_size = stats["bytes_datos"]
             total_calculado = header_size + data_size
             
             # Determinar tipo de archivo original
@@ -216,7 +204,7 @@ class ImagenTab(QWidget):
                               "o imágenes más grandes con áreas uniformes.")
             
             # Calcular eficiencia de RLE
-            bytes_sin_comprimir = total_pixels * 3  # RGB sin comprimir
+            bytes_sin_comprimir = stats["bytes_sin_comprimir"]  # Píxeles en su modo original
             ratio_vs_raw = (1 - (comp / bytes_sin_comprimir)) * 100
             
             # Mostrar resultados
@@ -230,15 +218,15 @@ class ImagenTab(QWidget):
                 f"Dimensiones: {w} x {h} = {total_pixels:,} píxeles\n"
                 f"Corridas detectadas: {runs:,}\n"
                 f"Promedio de longitud por corrida: {promedio_corrida:.2f} píxeles\n"
-                f"Colores únicos en corridas: {len(unique_colors):,}\n\n"
+                f"Colores únicos en corridas: {stats['colores']:,}\n\n"
                 f"--- Desglose del archivo RLE ---\n"
                 f"Header (metadatos): {header_size} bytes\n"
-                f"Datos RLE: {data_size:,} bytes ({runs:,} corridas × 4 bytes)\n"
+                f"Datos RLE: {data_size:,} bytes ({runs:,} corridas)\n"
                 f"Total calculado: {total_calculado:,} bytes\n"
                 f"Archivo real: {comp:,} bytes\n"
                 f"Overhead del header: {((header_size / comp) * 100):.4f}%\n\n"
                 f"--- Comparación con datos sin comprimir ---\n"
-                f"Tamaño raw (RGB): {bytes_sin_comprimir:,} bytes\n"
+                f"Tamaño raw ({stats['modo']}): {bytes_sin_comprimir:,} bytes\n"
                 f"Compresión vs raw: {ratio_vs_raw:.2f}%"
             )
 
@@ -321,15 +309,13 @@ class AudioTab(QWidget):
             orig = os.path.getsize(self.filepath)
             comp = os.path.getsize(out)
 
-            import pickle
-            with open(out, 'rb') as f:
-                params, compressed = pickle.load(f)
-                # params = (nchannels, sampwidth, framerate, nframes, comptype, compname)
-                nch, sampwidth, fr, nframes, *_ = params
+            nch = stats["canales"]
+            sampwidth = stats["bits"] // 8
+            fr = stats["frecuencia"]
 
             # Calcular estadísticas RLE adaptado
-            total_muestras = nframes * nch
-            corridas = len(compressed)
+            total_muestras = stats["samples"]
+            corridas = stats["runs"]
             promedio_corrida = total_muestras / corridas if corridas != 0 else 0
             porcentaje_compresion = (1 - (comp / orig)) * 100 if orig != 0 else 0
 
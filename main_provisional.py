@@ -120,15 +120,13 @@ class TextoView(QWidget):
             
             return
         try:
-            out = text_compressor.comprimir_archivo(self.filepath, OUT_DIR)
+            stats = {}
+            out = text_compressor.comprimir_archivo(self.filepath, OUT_DIR, stats)
             orig = os.path.getsize(self.filepath)
             comp = os.path.getsize(out)
-            import pickle
-            with open(out, 'rb') as f:
-                freq, padding, data_bytes = pickle.load(f)
 
-            total_bits = len(data_bytes) * 8 - padding
-            tamano_real_comprimido = len(data_bytes)
+            total_bits = stats["bits"]
+            tamano_real_comprimido = stats["bytes_datos"]
             porcentaje_compresion = (1 - (tamano_real_comprimido / orig)) * 100 if orig != 0 else 0
 
             self.result.setPlainText(
@@ -219,20 +217,12 @@ class ImagenView(QWidget):
             show_message(self, "Error", "⚠️ Carga primero una imagen", tipo="warning")
             return
         try:
-            out = image_compressor.comprimir_imagen(self.filepath, OUT_DIR)
+            stats = {}
+            out = image_compressor.comprimir_imagen(self.filepath, OUT_DIR, stats)
             orig = os.path.getsize(self.filepath)
             comp = os.path.getsize(out)
-
-            with open(out, "rb") as f:
-                w = int.from_bytes(f.read(4), 'big')
-                h = int.from_bytes(f.read(4), 'big')
-                num_runs = int.from_bytes(f.read(4), 'big')
-                unique_colors = set()
-                for _ in range(num_runs):
-                    data = f.read(4)
-                    if len(data) < 4: break
-                    r, g, b, count = data[0], data[1], data[2], data[3]
-                    unique_colors.add((r, g, b))
+            w, h = stats["ancho"], stats["alto"]
+            num_runs = stats["corridas"]
 
             total_pixels = w * h
             runs = num_runs
@@ -246,7 +236,7 @@ class ImagenView(QWidget):
                 f"Dimensiones: {w}x{h}, píxeles: {total_pixels}\n"
                 f"Corridas detectadas: {runs}\n"
                 f"Promedio por corrida: {promedio_corrida:.2f}\n"
-                f"Colores únicos: {len(unique_colors)}"
+                f"Colores únicos: {stats['colores']}"
             )
         except Exception as e:
             show_message(self, "Error", str(e), tipo="error")
@@ -332,13 +322,12 @@ class AudioView(QWidget):
             orig = os.path.getsize(self.filepath)
             comp = os.path.getsize(out)
 
-            import pickle
-            with open(out, 'rb') as f:
-                params, compressed = pickle.load(f)
-                nch, sampwidth, fr, nframes, *_ = params
+            nch = stats["canales"]
+            sampwidth = stats["bits"] // 8
+            fr = stats["frecuencia"]
 
-            total_muestras = nframes * nch
-            corridas = len(compressed)
+            total_muestras = stats["samples"]
+            corridas = stats["runs"]
             promedio_corrida = total_muestras / corridas if corridas != 0 else 0
             porcentaje_compresion = (1 - (comp / orig)) * 100 if orig != 0 else 0
 